@@ -0,0 +1,77 @@
+import time
+from itertools import islice
+
+import pandas as pd
+
+DEFAULT_CHUNK_SIZE = 5000
+
+
+def _iter_rows(records, columns):
+    """
+    Turn a DataFrame, or an iterable of dicts/tuples, into tuples in the
+    order of `columns`. NaN values from pandas become None (NULL).
+    """
+    if isinstance(records, pd.DataFrame):
+        df = records[columns].astype(object)
+        df = df.where(pd.notna(df), None)
+        yield from df.itertuples(index=False, name=None)
+        return
+
+    for record in records:
+        if isinstance(record, dict):
+            yield tuple(record.get(col) for col in columns)
+        else:
+            yield tuple(record)
+
+
+def insert_many(conn, table_name, columns, records, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Insert many rows with executemany inside a single transaction.
+
+    Args:
+        conn: Database connection
+        table_name: Name of the target table
+        columns: Column names, in the order the values are given
+        records: DataFrame, or iterable of dicts / tuples
+        chunk_size: Number of rows sent to executemany at a time
+
+    Returns:
+        list: IDs assigned to the inserted rows, in input order
+    """
+    if chunk_size < 1:
+        raise ValueError("chunk_size must be at least 1")
+
+    placeholders = ", ".join("?" for _ in columns)
+    sql = f"INSERT INTO {table_name} ({', '.join(columns)}) VALUES ({placeholders})"
+
+    rows = _iter_rows(records, columns)
+    ids = []
+    start = time.perf_counter()
+
+    # Take the write lock once for the whole batch, so the ids handed out
+    # by AUTOINCREMENT are consecutive inside each chunk
+    own_transaction = not conn.in_transaction
+    if own_transaction:
+        conn.execute("BEGIN IMMEDIATE")
+
+    try:
+        cur = conn.cursor()
+        while True:
+            chunk = list(islice(rows, chunk_size))
+            if not chunk:
+                break
+            cur.executemany(sql, chunk)
+            last_id = cur.execute("SELECT last_insert_rowid()").fetchone()[0]
+            ids.extend(range(last_id - len(chunk) + 1, last_id + 1))
+
+        if own_transaction:
+            conn.commit()
+    except Exception:
+        if own_transaction:
+            conn.rollback()
+        raise
+
+    elapsed = time.perf_counter() - start
+    rate = len(ids) / elapsed if elapsed > 0 else float("inf")
+    print(f"✅ Inserted {len(ids)} rows into {table_name} in {elapsed:.2f}s ({rate:,.0f} rows/s).")
+    return ids
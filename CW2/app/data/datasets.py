@@ -2,6 +2,7 @@ import pandas as pd
 from pathlib import Path
 from app.data.db import connect_database
 from app.data.incidents import load_csv_to_table
+from app.data.bulk import insert_many, DEFAULT_CHUNK_SIZE
 
 
 def load_datasets_csv(conn, csv_path):
@@ -24,6 +25,19 @@ def insert_dataset(conn, dataset_name, category, source, last_updated, record_co
     return cur.lastrowid
 
 
+def insert_datasets_many(conn, records, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Insert many dataset metadata records in one transaction.
+
+    records can be a DataFrame or an iterable of dicts / tuples with the columns
+    (dataset_name, category, source, last_updated, record_count, file_size_mb).
+    Returns the list of inserted IDs.
+    """
+    columns = ["dataset_name", "category", "source", "last_updated",
+               "record_count", "file_size_mb"]
+    return insert_many(conn, "datasets_metadata", columns, records, chunk_size)
+
+
 def get_all_datasets(conn):
     """Return a DataFrame of all datasets."""
     return pd.read_sql_query("SELECT * FROM datasets_metadata ORDER BY id DESC", conn)
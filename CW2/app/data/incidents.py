@@ -1,16 +1,32 @@
+import time
 import pandas as pd
 from pathlib import Path
 from app.data.db import connect_database
+from app.data.bulk import insert_many, DEFAULT_CHUNK_SIZE
+from app.data.staging import load_csv_via_staging
+from app.data.parsers import iter_file_chunks
 
 
-def load_csv_to_table(conn, csv_path, table_name):
+def load_csv_to_table(conn, csv_path, table_name, chunk_size=None, progress=None, staging=True,
+                      parser=None):
     """
-    Load a CSV file into a database table using pandas.
+    Load a CSV, JSONL or Parquet file into a database table.
 
     Args:
         conn: Database connection
-        csv_path: Path to CSV file
+        csv_path: Path to the file; .csv, .jsonl / .ndjson or .parquet
+                  (see app.data.parsers.FILE_FORMATS)
         table_name: Name of the target table
+        chunk_size: If set, stream the file in chunks of this many rows
+                    instead of reading it all into memory
+        progress: Optional callback progress(rows_done, rows_per_sec, eta_seconds),
+                  called after each chunk in streaming mode
+        staging: Load through a temporary staging table and validate / dedupe
+                 with SQL joins (see app.data.staging). If False, rows are
+                 checked in pandas before being appended.
+        parser: Parser backend for the chunked loads: "arrow" (pyarrow's
+                multithreaded readers), "pandas" or "auto" (default, arrow
+                when installed); see app.data.parsers
 
     Returns:
         int: Number of rows loaded
@@ -19,9 +35,18 @@ def load_csv_to_table(conn, csv_path, table_name):
     csv_path = Path(csv_path)
 
     if not csv_path.exists():
-        print(f"⚠️  CSV not found: {csv_path}, {table_name} can't be loaded.")
+        print(f"⚠️  File not found: {csv_path}, {table_name} can't be loaded.")
         return 0
 
+    if staging:
+        return load_csv_via_staging(conn, csv_path, table_name,
+                                    chunk_size or DEFAULT_CHUNK_SIZE, progress, parser=parser)
+
+    # Only CSVs can be read whole by the in-memory path below
+    if chunk_size or csv_path.suffix.lower() != ".csv":
+        return _load_csv_streaming(conn, csv_path, table_name, chunk_size or DEFAULT_CHUNK_SIZE,
+                                   progress, parser)
+
     df = pd.read_csv(csv_path)
 
     # If we're loading incidents, validate 'reported_by' values against users table
@@ -44,6 +69,13 @@ def load_csv_to_table(conn, csv_path, table_name):
 
     # avoid UNIQUE constraint errors
     if table_name == "it_tickets" and "ticket_id" in df.columns:
+        # reject rows with no ticket_id (the column is NOT NULL)
+        missing_id = df["ticket_id"].astype("string").str.strip().fillna("").eq("")
+        if missing_id.any():
+            print(f"⚠️  it_tickets: rejected {int(missing_id.sum())} rows with no ticket_id "
+                  f"in {csv_path.name}.")
+            df = df[~missing_id]
+
         # drop duplicates inside CSV by ticket_id
         before_len = len(df)
         df = df.drop_duplicates(subset=["ticket_id"], keep="first")
@@ -59,7 +91,7 @@ def load_csv_to_table(conn, csv_path, table_name):
 
         if existing:
             df_before_existing_filter = len(df)
-            df = df[df["ticket_id"].isin(existing)]
+            df = df[~df["ticket_id"].isin(existing)]
             skipped_due_to_existing = df_before_existing_filter - len(df)
         else:
             skipped_due_to_existing = 0
@@ -85,6 +117,156 @@ def load_csv_to_table(conn, csv_path, table_name):
     return row_cnt
 
 
+def print_progress(rows_done, rows_per_sec, eta_seconds):
+    """Default progress callback for streaming loads."""
+    print(f"  ... {rows_done:,} rows, {rows_per_sec:,.0f} rows/s, ETA {eta_seconds:.0f}s")
+
+
+def _get_usernames(conn):
+    """Return the set of usernames in the users table (empty if unavailable)."""
+    try:
+        cur = conn.cursor()
+        cur.execute("SELECT username FROM users")
+        return {row[0] for row in cur.fetchall() if row[0] is not None}
+    except Exception:
+        return set()
+
+
+def _existing_ticket_ids(conn, ticket_ids, batch=500):
+    """Return which of the given ticket_ids are already in it_tickets."""
+    ticket_ids = list(ticket_ids)
+    existing = set()
+    cur = conn.cursor()
+    # Look the ids up in small batches so we stay under SQLite's parameter limit
+    for i in range(0, len(ticket_ids), batch):
+        part = ticket_ids[i:i + batch]
+        placeholders = ", ".join("?" for _ in part)
+        try:
+            cur.execute(
+                f"SELECT ticket_id FROM it_tickets WHERE ticket_id IN ({placeholders})",
+                part
+            )
+        except Exception:
+            return set()
+        existing.update(row[0] for row in cur.fetchall())
+    return existing
+
+
+def _validate_chunk(df, table_name, users):
+    """
+    Validate one chunk without touching the database.
+
+    - cyber_incidents: reported_by values that aren't known users become NULL
+    - it_tickets: rows with a missing or blank ticket_id are rejected, and
+      repeated ticket_ids inside the chunk are dropped
+
+    Returns:
+        tuple: (validated DataFrame, duplicates dropped inside the chunk,
+                rows rejected for a missing ticket_id)
+    """
+    dropped_in_csv = 0
+    rejected = 0
+
+    # Only keep reported_by values that match a known user
+    if table_name == "cyber_incidents" and "reported_by" in df.columns:
+        reported = df["reported_by"].astype("string").str.strip()
+        df["reported_by"] = reported.where(reported.isin(users), None).astype(object)
+
+    if table_name == "it_tickets" and "ticket_id" in df.columns:
+        # ticket_id is NOT NULL in the table, and blank ones can't be deduped
+        missing_id = df["ticket_id"].astype("string").str.strip().fillna("").eq("")
+        rejected = int(missing_id.sum())
+        df = df[~missing_id]
+
+        before_len = len(df)
+        df = df.drop_duplicates(subset=["ticket_id"], keep="first")
+        dropped_in_csv = before_len - len(df)
+
+    return df, dropped_in_csv, rejected
+
+
+def _drop_existing_rows(conn, df, table_name):
+    """
+    Drop rows whose ticket_id is already in the database (loaded by an
+    earlier chunk or an earlier run).
+
+    Returns:
+        tuple: (remaining DataFrame, rows skipped)
+    """
+    if table_name != "it_tickets" or "ticket_id" not in df.columns:
+        return df, 0
+
+    existing = _existing_ticket_ids(conn, df["ticket_id"].dropna().unique())
+    if not existing:
+        return df, 0
+
+    before_len = len(df)
+    df = df[~df["ticket_id"].isin(existing)]
+    return df, before_len - len(df)
+
+
+def _clean_chunk(conn, df, table_name, users):
+    """
+    Validate and dedupe one chunk before it is appended.
+
+    Returns:
+        tuple: (cleaned DataFrame, duplicates dropped inside the chunk,
+                rows skipped because they already exist in the DB,
+                rows rejected for a missing ticket_id)
+    """
+    df, dropped_in_csv, rejected = _validate_chunk(df, table_name, users)
+    df, skipped_existing = _drop_existing_rows(conn, df, table_name)
+    return df, dropped_in_csv, skipped_existing, rejected
+
+
+def _load_csv_streaming(conn, csv_path, table_name, chunk_size, progress, parser=None):
+    """
+    Stream a CSV, JSONL or Parquet file into a table chunk by chunk.
+
+    Only one chunk is in memory at a time and each chunk is appended and
+    committed in its own transaction.
+    """
+    users = _get_usernames(conn) if table_name == "cyber_incidents" else set()
+
+    total_bytes = csv_path.stat().st_size
+    row_cnt = 0
+    dropped_in_csv = 0
+    skipped_existing = 0
+    rejected = 0
+    start = time.perf_counter()
+
+    for chunk, done_bytes in iter_file_chunks(csv_path, table_name, chunk_size, backend=parser):
+        chunk, dropped, skipped, bad = _clean_chunk(conn, chunk, table_name, users)
+        dropped_in_csv += dropped
+        skipped_existing += skipped
+        rejected += bad
+
+        if len(chunk) > 0:
+            chunk.to_sql(name=table_name, con=conn, if_exists="append", index=False)
+            conn.commit()
+            row_cnt += len(chunk)
+
+        if progress:
+            elapsed = time.perf_counter() - start
+            rate = row_cnt / elapsed if elapsed > 0 else 0.0
+            # Estimate what's left from how far through the file we are
+            eta = elapsed * (total_bytes - done_bytes) / done_bytes if done_bytes else 0.0
+            progress(row_cnt, rate, eta)
+
+    if dropped_in_csv or skipped_existing:
+        print(f"  - {table_name}: dropped {dropped_in_csv} duplicate rows from the file; "
+              f"skipped {skipped_existing} rows that already exist in DB.")
+    if rejected:
+        print(f"⚠️  {table_name}: rejected {rejected} rows with no ticket_id in {csv_path.name}.")
+
+    if row_cnt == 0:
+        print(f"No new rows to insert into {table_name} from {csv_path.name}.")
+        return 0
+
+    print(f"✅ Loaded {row_cnt} rows from {csv_path.name} into {table_name}.")
+    return row_cnt
+
+
 def load_incidents_csv(conn, csv_path):
     """Load cyber_incidents.csv into the cyber_incidents table."""
     return load_csv_to_table(conn, csv_path, "cyber_incidents")
@@ -110,6 +292,23 @@ def insert_incident(conn, date, incident_type, severity, status, description, re
     return cursor.lastrowid
 
 
+def insert_incidents_many(conn, records, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Insert many cyber incidents in one transaction.
+
+    Args:
+        conn: Database connection
+        records: DataFrame, or iterable of dicts / tuples with the columns
+                 (date, incident_type, severity, status, description, reported_by)
+        chunk_size: Number of rows per executemany call
+
+    Returns:
+        list: IDs of the inserted incidents
+    """
+    columns = ["date", "incident_type", "severity", "status", "description", "reported_by"]
+    return insert_many(conn, "cyber_incidents", columns, records, chunk_size)
+
+
 def get_all_incidents(conn):
     """
     Retrieve all incidents from the database.
@@ -153,45 +352,52 @@ def delete_incident(conn, incident_id):
     return cursor.rowcount
 
 
+# Analytical queries, also checked against the indexes by
+# app.data.migrations.check_query_plans()
+INCIDENTS_BY_TYPE_SQL = """
+SELECT incident_type, COUNT(*) as count
+FROM cyber_incidents
+GROUP BY incident_type
+ORDER BY count DESC
+"""
+
+HIGH_SEVERITY_BY_STATUS_SQL = """
+SELECT status, COUNT(*) as count
+FROM cyber_incidents
+WHERE severity = 'High'
+GROUP BY status
+ORDER BY count DESC
+"""
+
+# Parameter: min_count
+INCIDENT_TYPES_WITH_MANY_CASES_SQL = """
+SELECT incident_type, COUNT(*) as count
+FROM cyber_incidents
+GROUP BY incident_type
+HAVING COUNT(*) > ?
+ORDER BY count DESC
+"""
+
+
 def get_incidents_by_type_count(conn):
     """
     Count incidents by type.
     """
-    query = """
-    SELECT incident_type, COUNT(*) as count
-    FROM cyber_incidents
-    GROUP BY incident_type
-    ORDER BY count DESC
-    """
-    return pd.read_sql_query(query, conn)
+    return pd.read_sql_query(INCIDENTS_BY_TYPE_SQL, conn)
 
 
 def get_high_severity_by_status(conn):
     """
     Count high severity incidents by status.
     """
-    query = """
-    SELECT status, COUNT(*) as count
-    FROM cyber_incidents
-    WHERE severity = 'High'
-    GROUP BY status
-    ORDER BY count DESC
-    """
-    return pd.read_sql_query(query, conn)
+    return pd.read_sql_query(HIGH_SEVERITY_BY_STATUS_SQL, conn)
 
 
 def get_incident_types_with_many_cases(conn, min_count=5):
     """
     Find incident types with more than min_count cases.
     """
-    query = """
-    SELECT incident_type, COUNT(*) as count
-    FROM cyber_incidents
-    GROUP BY incident_type
-    HAVING COUNT(*) > ?
-    ORDER BY count DESC
-    """
-    return pd.read_sql_query(query, conn, params=(min_count,))
+    return pd.read_sql_query(INCIDENT_TYPES_WITH_MANY_CASES_SQL, conn, params=(min_count,))
 
 
 if __name__ == "__main__":
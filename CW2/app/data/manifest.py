@@ -0,0 +1,181 @@
+import hashlib
+import os
+import shutil
+import tempfile
+from pathlib import Path
+
+from app.data.bulk import DEFAULT_CHUNK_SIZE
+from app.data.incidents import load_csv_to_table
+from app.data.staging import reload_table_from_csv
+
+HASH_BLOCK_SIZE = 1024 * 1024
+
+
+def _hash_file(path, prefix_len=None):
+    """
+    sha256 of a whole file, read in blocks.
+
+    Returns:
+        tuple: (hash of the first prefix_len bytes or None, hash of the whole file)
+    """
+    digest = hashlib.sha256()
+    prefix_hash = None
+    done = 0
+    with open(path, "rb") as f:
+        while True:
+            block = f.read(HASH_BLOCK_SIZE)
+            if not block:
+                break
+            if prefix_len is not None and prefix_hash is None and done + len(block) >= prefix_len:
+                # Hash exactly up to prefix_len, remember it, then carry on
+                cut = prefix_len - done
+                digest.update(block[:cut])
+                prefix_hash = digest.hexdigest()
+                digest.update(block[cut:])
+            else:
+                digest.update(block)
+            done += len(block)
+    return prefix_hash, digest.hexdigest()
+
+
+def _ends_with_newline(path, size):
+    """True if the byte just before offset size is a newline."""
+    if size == 0:
+        return False
+    with open(path, "rb") as f:
+        f.seek(size - 1)
+        return f.read(1) == b"\n"
+
+
+def get_manifest_entry(conn, csv_path):
+    """
+    Return what the manifest knows about a file.
+
+    Returns:
+        dict: table_name, size, mtime_ns, content_hash and rows_loaded; None if
+              the file has never been loaded
+    """
+    cur = conn.cursor()
+    cur.execute(
+        "SELECT table_name, size, mtime_ns, content_hash, rows_loaded FROM ingest_manifest WHERE path = ?",
+        (str(Path(csv_path).resolve()),)
+    )
+    row = cur.fetchone()
+    if row is None:
+        return None
+    return dict(zip(("table_name", "size", "mtime_ns", "content_hash", "rows_loaded"), row))
+
+
+def _record(conn, csv_path, table_name, stat, content_hash, rows_loaded):
+    """Insert or update a file's manifest entry."""
+    conn.execute(
+        """
+        INSERT INTO ingest_manifest (path, table_name, size, mtime_ns, content_hash, rows_loaded)
+        VALUES (?, ?, ?, ?, ?, ?)
+        ON CONFLICT(path) DO UPDATE SET
+            table_name = excluded.table_name,
+            size = excluded.size,
+            mtime_ns = excluded.mtime_ns,
+            content_hash = excluded.content_hash,
+            rows_loaded = excluded.rows_loaded,
+            loaded_at = CAST(strftime('%s', 'now') AS INTEGER)
+        """,
+        (str(Path(csv_path).resolve()), table_name, stat.st_size, stat.st_mtime_ns, content_hash, rows_loaded)
+    )
+    conn.commit()
+
+
+def _load_tail(conn, csv_path, table_name, offset, chunk_size):
+    """
+    Load only the bytes after offset, with a CSV's header line in front
+    (JSON Lines records stand on their own).
+
+    The tail is copied to a temporary file next to the source, so memory
+    doesn't depend on how much was appended.
+    """
+    suffix = Path(csv_path).suffix.lower()
+    with open(csv_path, "rb") as src:
+        header = src.readline() if suffix == ".csv" else b""
+        src.seek(offset)
+        fd, tmp_name = tempfile.mkstemp(suffix=suffix, dir=Path(csv_path).parent)
+        try:
+            with os.fdopen(fd, "wb") as tmp:
+                tmp.write(header)
+                shutil.copyfileobj(src, tmp, HASH_BLOCK_SIZE)
+            return load_csv_to_table(conn, tmp_name, table_name, chunk_size=chunk_size)
+        finally:
+            os.remove(tmp_name)
+
+
+def ingest_file(conn, csv_path, table_name, chunk_size=None, reload_rewritten=False):
+    """
+    Load a source file only as far as it has changed since the last run.
+
+    - Same size and mtime as in the manifest: skipped without reading it.
+    - Larger, and the first <old size> bytes hash to the recorded hash: only
+      the appended tail is loaded.
+    - Anything else that changed: the whole file is loaded again with
+      load_csv_to_table, which skips rows that are already there. Rows in
+      the table that came from elsewhere (insert_*, the ingest worker,
+      other files) are kept.
+    - Not in the manifest: loaded with load_csv_to_table.
+
+    Args:
+        conn: Database connection
+        csv_path: Path to the source CSV
+        table_name: Table it is loaded into
+        chunk_size: Rows per chunk, passed to the loaders
+        reload_rewritten: Replace the whole table with a rewritten file
+                          (reload_table_from_csv) instead. This deletes every
+                          row that isn't in the file, so only use it when the
+                          file is the table's only source.
+
+    Returns:
+        tuple: (action: 'skipped' | 'appended' | 'rewritten' | 'reloaded' |
+                'loaded' | 'missing', rows loaded by this call)
+    """
+    csv_path = Path(csv_path)
+    if not csv_path.exists():
+        print(f"⚠️  CSV not found: {csv_path}, {table_name} can't be loaded.")
+        return "missing", 0
+
+    stat = csv_path.stat()
+    entry = get_manifest_entry(conn, csv_path)
+
+    if entry is None:
+        # Hash first, so the manifest describes the bytes that were loaded
+        _, content_hash = _hash_file(csv_path)
+        rows = load_csv_to_table(conn, csv_path, table_name, chunk_size=chunk_size)
+        _record(conn, csv_path, table_name, stat, content_hash, rows)
+        return "loaded", rows
+
+    # O(1): nothing but a stat and one indexed lookup
+    if entry["size"] == stat.st_size and entry["mtime_ns"] == stat.st_mtime_ns:
+        print(f"  - {csv_path.name} unchanged since last load, skipped.")
+        return "skipped", 0
+
+    old_size = entry["size"]
+    prefix_hash, content_hash = _hash_file(csv_path, prefix_len=old_size if stat.st_size > old_size else None)
+
+    if content_hash == entry["content_hash"]:
+        # Touched but not changed
+        _record(conn, csv_path, table_name, stat, content_hash, entry["rows_loaded"])
+        print(f"  - {csv_path.name} content unchanged since last load, skipped.")
+        return "skipped", 0
+
+    if prefix_hash == entry["content_hash"] and _ends_with_newline(csv_path, old_size):
+        rows = _load_tail(conn, csv_path, table_name, old_size, chunk_size)
+        _record(conn, csv_path, table_name, stat, content_hash, entry["rows_loaded"] + rows)
+        print(f"  - {csv_path.name} grew by {stat.st_size - old_size} bytes, loaded {rows} new rows.")
+        return "appended", rows
+
+    if reload_rewritten:
+        print(f"⚠️  {csv_path.name} was rewritten: REPLACING every row in {table_name} with its contents.")
+        rows = reload_table_from_csv(conn, csv_path, table_name, chunk_size=chunk_size or DEFAULT_CHUNK_SIZE)
+        _record(conn, csv_path, table_name, stat, content_hash, rows)
+        return "reloaded", rows
+
+    print(f"  - {csv_path.name} was rewritten, loading it again (existing rows are kept).")
+    rows = load_csv_to_table(conn, csv_path, table_name, chunk_size=chunk_size)
+    _record(conn, csv_path, table_name, stat, content_hash, entry["rows_loaded"] + rows)
+    return "rewritten", rows
@@ -0,0 +1,157 @@
+"""
+Versioned schema migrations.
+
+The schema version is stored in PRAGMA user_version. Each migration runs
+once, in its own transaction, and bumps the version when it succeeds, so
+running migrate() on a database that is already current does nothing.
+
+Migrations:
+    1  indexes for the filters and analytical queries on the domain tables
+    2  ingest_manifest: which source files were loaded, and their content hash
+    3  ingest_checkpoints: byte offsets for the watch-folder ingest worker
+"""
+
+from app.data.incidents import (
+    INCIDENTS_BY_TYPE_SQL,
+    HIGH_SEVERITY_BY_STATUS_SQL,
+    INCIDENT_TYPES_WITH_MANY_CASES_SQL,
+)
+
+# (version, description, SQL statements)
+MIGRATIONS = [
+    (1, "Indexes for dashboard filters and analytical queries", [
+        # Cybersecurity filters: severity / status / incident_type.
+        # (severity, status) also covers get_high_severity_by_status
+        "CREATE INDEX IF NOT EXISTS idx_incidents_severity_status "
+        "ON cyber_incidents (severity, status, incident_type)",
+        "CREATE INDEX IF NOT EXISTS idx_incidents_status ON cyber_incidents (status)",
+        "CREATE INDEX IF NOT EXISTS idx_incidents_type ON cyber_incidents (incident_type)",
+        "CREATE INDEX IF NOT EXISTS idx_incidents_date ON cyber_incidents (date)",
+
+        # IT Operations filters: priority / status / category
+        "CREATE INDEX IF NOT EXISTS idx_tickets_priority_status "
+        "ON it_tickets (priority, status, category)",
+        "CREATE INDEX IF NOT EXISTS idx_tickets_status ON it_tickets (status)",
+        "CREATE INDEX IF NOT EXISTS idx_tickets_category ON it_tickets (category)",
+        "CREATE INDEX IF NOT EXISTS idx_tickets_created_date ON it_tickets (created_date)",
+
+        # Data Science filters: category / source / file size range
+        "CREATE INDEX IF NOT EXISTS idx_datasets_category_source "
+        "ON datasets_metadata (category, source)",
+        "CREATE INDEX IF NOT EXISTS idx_datasets_source ON datasets_metadata (source)",
+        "CREATE INDEX IF NOT EXISTS idx_datasets_file_size ON datasets_metadata (file_size_mb)",
+    ]),
+    (2, "Ingestion manifest of loaded source files", [
+        # One row per source file; content_hash is the sha256 of the whole
+        # file as it was when last loaded, size/mtime_ns are what it had then
+        """
+        CREATE TABLE IF NOT EXISTS ingest_manifest (
+            path TEXT PRIMARY KEY,
+            table_name TEXT NOT NULL,
+            size INTEGER NOT NULL,
+            mtime_ns INTEGER NOT NULL,
+            content_hash TEXT NOT NULL,
+            rows_loaded INTEGER NOT NULL DEFAULT 0,
+            loaded_at INTEGER NOT NULL DEFAULT (CAST(strftime('%s', 'now') AS INTEGER))
+        )
+        """,
+    ]),
+    (3, "Byte-offset checkpoints for the watch-folder ingest worker", [
+        # byte_offset is the first byte not yet loaded; header is the CSV
+        # header line (NULL for JSONL)
+        """
+        CREATE TABLE IF NOT EXISTS ingest_checkpoints (
+            path TEXT PRIMARY KEY,
+            table_name TEXT NOT NULL,
+            byte_offset INTEGER NOT NULL DEFAULT 0,
+            header TEXT,
+            rows_loaded INTEGER NOT NULL DEFAULT 0,
+            updated_at INTEGER NOT NULL DEFAULT (CAST(strftime('%s', 'now') AS INTEGER))
+        )
+        """,
+    ]),
+]
+
+# Queries shipped in the data layer that must be answered from an index:
+# {query_name: (sql, params)}, using the same SQL the functions run.
+# (CW2's other reads are whole-table get_all_* queries.)
+INDEXED_QUERIES = {
+    "get_incidents_by_type_count": (INCIDENTS_BY_TYPE_SQL, []),
+    "get_high_severity_by_status": (HIGH_SEVERITY_BY_STATUS_SQL, []),
+    "get_incident_types_with_many_cases": (INCIDENT_TYPES_WITH_MANY_CASES_SQL, [5]),
+}
+
+
+def get_schema_version(conn):
+    """Return the schema version stored in PRAGMA user_version."""
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrate(conn):
+    """
+    Apply any migrations newer than the database's user_version.
+
+    Args:
+        conn: Database connection
+
+    Returns:
+        int: Number of migrations applied (0 if the schema was current)
+    """
+    current = get_schema_version(conn)
+    pending = [m for m in MIGRATIONS if m[0] > current]
+    if not pending:
+        return 0
+
+    if conn.in_transaction:
+        conn.commit()
+
+    for version, description, statements in pending:
+        try:
+            conn.execute("BEGIN")
+            for sql in statements:
+                conn.execute(sql)
+            # PRAGMA can't take a parameter, version is an int from MIGRATIONS
+            conn.execute(f"PRAGMA user_version = {int(version)}")
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        print(f"✅ Applied migration {version}: {description}")
+
+    return len(pending)
+
+
+def _plan_uses_index(sql, details):
+    """
+    Decide from EXPLAIN QUERY PLAN lines whether a query is served by an index.
+
+    Every table access must be a SEARCH (an index or rowid range) or a SCAN
+    of a covering index; a SCAN through a non-covering index still reads
+    every row, and more slowly than the table itself. A query with a LIMIT
+    must also not sort its matches ("USE TEMP B-TREE FOR ORDER BY"), or it
+    reads all of them before it can return the first row.
+    """
+    accesses = [d for d in details if d.startswith(("SCAN", "SEARCH"))]
+    if not accesses:
+        return False
+    for detail in accesses:
+        if detail.startswith("SCAN") and "USING COVERING INDEX" not in detail:
+            return False
+    sorts = any("USE TEMP B-TREE FOR ORDER BY" in detail for detail in details)
+    if sorts and "LIMIT" in sql.upper():
+        return False
+    return True
+
+
+def check_query_plans(conn):
+    """
+    Run EXPLAIN QUERY PLAN on every query in INDEXED_QUERIES.
+
+    Returns:
+        dict: {query_name: (uses_index: bool, plan: str)}
+    """
+    results = {}
+    for name, (sql, params) in INDEXED_QUERIES.items():
+        details = [row[-1] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}", params)]
+        results[name] = (_plan_uses_index(sql, details), "; ".join(details))
+    return results
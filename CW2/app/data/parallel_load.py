@@ -0,0 +1,160 @@
+import time
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from queue import Empty
+
+from app.data.incidents import _get_usernames, _validate_chunk, _drop_existing_rows
+from app.data.parsers import iter_file_chunks
+
+DEFAULT_CHUNK_SIZE = 50000
+
+# How often (seconds) the writer checks for parser processes that died
+WORKER_CHECK_SECONDS = 1.0
+
+
+def _parse_csv_worker(csv_path, table_name, chunk_size, users, queue):
+    """
+    Runs in a worker process: parse and validate one file in chunks and put
+    each chunk on the queue for the writer.
+
+    Queue messages are (csv_path, chunk, parse_s, validate_s, dropped, rejected).
+    A final message with chunk=None tells the writer this file is done;
+    if parsing failed the error text is sent in place of the timings.
+    """
+    try:
+        reader = (chunk for chunk, _ in iter_file_chunks(csv_path, table_name, chunk_size))
+        while True:
+            start = time.perf_counter()
+            chunk = next(reader, None)
+            parse_s = time.perf_counter() - start
+            if chunk is None:
+                break
+
+            start = time.perf_counter()
+            chunk, dropped, rejected = _validate_chunk(chunk, table_name, users)
+            validate_s = time.perf_counter() - start
+
+            queue.put((csv_path, chunk, parse_s, validate_s, dropped, rejected))
+    except Exception as e:
+        queue.put((csv_path, None, f"{type(e).__name__}: {e}", 0, 0, 0))
+        return
+
+    queue.put((csv_path, None, None, 0, 0, 0))
+
+
+def load_tables_parallel(conn, mapping, chunk_size=DEFAULT_CHUNK_SIZE, max_workers=None):
+    """
+    Load several CSV, JSONL or Parquet files at once.
+
+    Parsing and validation run in a process pool (one file per worker) while
+    the calling thread is the only writer, draining parsed chunks into SQLite
+    and committing each one. Several files may load the same table; their
+    timings are kept apart and only added up by print_load_timings().
+
+    Args:
+        conn: Database connection (only used by this thread)
+        mapping: dict of {csv_path: table_name}
+        chunk_size: Rows per parsed chunk
+        max_workers: Number of parser processes (default: one per file)
+
+    Returns:
+        dict: {csv_path (str): {"table", "rows", "parse_s", "validate_s", "write_s",
+                                "dropped", "skipped", "rejected", "error"}}
+    """
+    jobs = [(Path(path), table) for path, table in mapping.items()]
+    missing = [(path, table) for path, table in jobs if not path.exists()]
+    for path, table in missing:
+        print(f"⚠️  CSV not found: {path}, {table} can't be loaded.")
+    jobs = [job for job in jobs if job not in missing]
+
+    timings = {
+        str(path): {"table": table, "rows": 0, "parse_s": 0.0, "validate_s": 0.0, "write_s": 0.0,
+                    "dropped": 0, "skipped": 0, "rejected": 0, "error": None}
+        for path, table in jobs
+    }
+    if not jobs:
+        return timings
+
+    users = _get_usernames(conn)
+    max_workers = max_workers or len(jobs)
+
+    with multiprocessing.Manager() as manager:
+        # Bounded queue: parsers block if the writer falls behind
+        queue = manager.Queue(maxsize=max_workers * 2)
+
+        with ProcessPoolExecutor(max_workers=max_workers) as pool:
+            futures = {}
+            for path, table in jobs:
+                table_users = users if table == "cyber_incidents" else set()
+                futures[str(path)] = pool.submit(_parse_csv_worker, str(path), table, chunk_size,
+                                                 table_users, queue)
+
+            files_left = set(futures)
+            while files_left:
+                try:
+                    path, chunk, parse_s, validate_s, dropped, rejected = queue.get(
+                        timeout=WORKER_CHECK_SECONDS)
+                except Empty:
+                    # A parser that died (killed, broken pool, couldn't start)
+                    # never sends its final message; its future says why
+                    for path in list(files_left):
+                        future = futures[path]
+                        if future.done() and future.exception() is not None:
+                            error = future.exception()
+                            timings[path]["error"] = f"{type(error).__name__}: {error}"
+                            files_left.discard(path)
+                    continue
+                stats = timings[path]
+                table = stats["table"]
+
+                if chunk is None:
+                    files_left.discard(path)
+                    if parse_s is not None:
+                        stats["error"] = parse_s
+                    continue
+
+                stats["parse_s"] += parse_s
+                stats["validate_s"] += validate_s
+                stats["dropped"] += dropped
+                stats["rejected"] += rejected
+
+                start = time.perf_counter()
+                chunk, skipped = _drop_existing_rows(conn, chunk, table)
+                if len(chunk) > 0:
+                    chunk.to_sql(name=table, con=conn, if_exists="append", index=False)
+                    conn.commit()
+                stats["write_s"] += time.perf_counter() - start
+                stats["rows"] += len(chunk)
+                stats["skipped"] += skipped
+
+    return timings
+
+
+def print_load_timings(timings, wall_s):
+    """Print the parse / validate / write breakdown, added up per table."""
+    per_table = {}
+    for stats in timings.values():
+        totals = per_table.setdefault(stats["table"], {
+            "rows": 0, "parse_s": 0.0, "validate_s": 0.0, "write_s": 0.0, "dropped": 0, "skipped": 0,
+            "rejected": 0,
+        })
+        for field in totals:
+            totals[field] += stats[field]
+
+    print(f"\n{'Table':<20} {'Rows':>10} {'Parse s':>9} {'Valid. s':>9} {'Write s':>9}")
+    print("-" * 61)
+    for table, stats in per_table.items():
+        print(f"{table:<20} {stats['rows']:>10} {stats['parse_s']:>9.2f} "
+              f"{stats['validate_s']:>9.2f} {stats['write_s']:>9.2f}")
+        if stats["dropped"] or stats["skipped"]:
+            print(f"  - {table}: dropped {stats['dropped']} duplicate rows from the files; "
+                  f"skipped {stats['skipped']} rows that already exist in DB.")
+        if stats["rejected"]:
+            print(f"  ⚠️  {table}: rejected {stats['rejected']} rows with no ticket_id.")
+
+    # Errors stay per file, so it's clear which one failed
+    for path, stats in timings.items():
+        if stats["error"]:
+            print(f"  Error loading {Path(path).name} into {stats['table']}: {stats['error']}")
+    print(f"Wall time: {wall_s:.2f}s")
@@ -0,0 +1,506 @@
+"""
+File parser backends for the loaders.
+
+Parsing is most of the cost of loading a big export. Files are read into
+DataFrame chunks with the explicit per-table types in TABLE_SCHEMAS, so
+nothing is inferred. Three formats are understood, picked by suffix
+(see FILE_FORMATS):
+
+- .csv: pyarrow's multithreaded CSV reader ("arrow" backend) or pandas'
+  C parser ("pandas" backend)
+- .jsonl / .ndjson: JSON Lines, streamed block by block by pyarrow, or
+  in chunks by pandas
+- .parquet: read one row group at a time with pyarrow, and only the
+  columns the table needs are read from disk (needs pyarrow)
+
+"auto" (the default, or env CSV_PARSER) picks arrow if it can be imported.
+If arrow can't parse a CSV or JSONL file with its schema (e.g. a malformed
+date) the rest of the file is read with pandas, which keeps such values
+as text.
+
+Benchmarks on the three CW2/DATA schemas:
+    python -m app.data.parsers --rows 1000000             # arrow vs pandas CSV
+    python -m app.data.parsers --rows 1000000 --formats   # CSV vs JSONL vs Parquet
+"""
+
+import json
+import os
+import time
+from pathlib import Path
+
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pa_compute
+    import pyarrow.csv as pa_csv
+    import pyarrow.json as pa_json
+    import pyarrow.parquet as pa_parquet
+except ImportError:
+    pa = None
+
+PARSER_SETTINGS = {
+    "backend": os.environ.get("CSV_PARSER", "auto"),
+    # Files up to this size are parsed in one multithreaded read; bigger
+    # ones are streamed block by block so memory stays bounded
+    "max_in_memory_mb": 256,
+    "block_size": 16 * 1024 * 1024,
+}
+
+# Column types per table:
+#   text      free text
+#   category  few distinct values (dictionary encoded by arrow, Categorical in pandas)
+#   date      YYYY-MM-DD (validated by arrow, written back out as YYYY-MM-DD)
+#   int / float
+TABLE_SCHEMAS = {
+    "cyber_incidents": {
+        "date": "date",
+        "incident_type": "category",
+        "severity": "category",
+        "status": "category",
+        "description": "text",
+        "reported_by": "text",
+    },
+    "it_tickets": {
+        "ticket_id": "text",
+        "priority": "category",
+        "status": "category",
+        "category": "category",
+        "subject": "text",
+        "description": "text",
+        "created_date": "date",
+        "resolved_date": "date",
+        "assigned_to": "text",
+    },
+    "datasets_metadata": {
+        "dataset_name": "text",
+        "category": "category",
+        "source": "category",
+        "last_updated": "date",
+        "record_count": "int",
+        "file_size_mb": "float",
+    },
+}
+
+_PANDAS_DTYPES = {
+    "text": "str",
+    "category": "category",
+    # pandas would have to parse dates one by one; they stay as text
+    "date": "str",
+    "int": "Int64",
+    "float": "float64",
+}
+
+
+def arrow_available():
+    """True if pyarrow could be imported."""
+    return pa is not None
+
+
+def resolve_backend(backend=None):
+    """
+    Work out which backend to use.
+
+    Args:
+        backend: "arrow", "pandas" or "auto" (default: PARSER_SETTINGS)
+
+    Returns:
+        str: "arrow" or "pandas"
+    """
+    backend = backend or PARSER_SETTINGS["backend"]
+    if backend not in ("auto", "arrow", "pandas"):
+        raise ValueError(f"Unknown CSV parser backend: {backend}")
+    if backend == "pandas":
+        return "pandas"
+    if not arrow_available():
+        if backend == "arrow":
+            print("⚠️  pyarrow isn't installed, parsing with pandas instead.")
+        return "pandas"
+    return "arrow"
+
+
+def _arrow_types(table_name, columns, for_json=False):
+    """
+    Arrow column types for the schema columns that are being read.
+
+    The JSON reader can't build dates or dictionaries itself, so for JSON
+    those columns are read as strings and converted by _conform_batch.
+    """
+    arrow_types = {
+        "text": pa.string(),
+        "category": pa.string() if for_json else pa.dictionary(pa.int32(), pa.string()),
+        "date": pa.string() if for_json else pa.date32(),
+        "int": pa.int64(),
+        "float": pa.float64(),
+    }
+    schema = TABLE_SCHEMAS.get(table_name, {})
+    return {col: arrow_types[kind] for col, kind in schema.items() if col in columns}
+
+
+def _pandas_dtypes(table_name, columns):
+    """pandas dtypes for the schema columns that are being read."""
+    schema = TABLE_SCHEMAS.get(table_name, {})
+    return {col: _PANDAS_DTYPES[kind] for col, kind in schema.items() if col in columns}
+
+
+def _conform_batch(batch, table_name, check_dates=True):
+    """
+    Arrow record batch -> DataFrame in the table's schema.
+
+    Date columns are checked by casting them to date32 (raises ArrowInvalid
+    for a value that isn't a date, unless check_dates is False) and written
+    back out as YYYY-MM-DD text; category columns are dictionary encoded.
+    """
+    schema = TABLE_SCHEMAS.get(table_name, {})
+    columns = []
+    for name, column in zip(batch.schema.names, batch.columns):
+        kind = schema.get(name)
+        if kind == "date":
+            if pa.types.is_string(column.type) and check_dates:
+                column = pa_compute.cast(column, pa.date32())
+            if pa.types.is_date(column.type):
+                # A plain cast gives ISO dates and is much cheaper than strftime
+                column = pa_compute.cast(column, pa.string())
+        elif kind == "category" and not pa.types.is_dictionary(column.type):
+            column = pa_compute.dictionary_encode(column)
+        elif kind in ("int", "float") and pa.types.is_null(column.type):
+            column = column.cast(pa.int64() if kind == "int" else pa.float64())
+        columns.append(column)
+    return pa.RecordBatch.from_arrays(columns, names=batch.schema.names).to_pandas()
+
+
+def _apply_pandas_schema(df, table_name, columns):
+    """Give a DataFrame read without dtypes (JSON) the table's columns and types."""
+    df = df.reindex(columns=columns)
+    for col, dtype in _pandas_dtypes(table_name, columns).items():
+        if dtype != "str":
+            df[col] = df[col].astype(dtype)
+    return df
+
+
+def _slices(batch, chunk_size):
+    """Split an arrow batch into pieces of at most chunk_size rows."""
+    for start in range(0, batch.num_rows, chunk_size):
+        yield batch.slice(start, chunk_size)
+
+
+def _with_pandas_fallback(path, table_name, arrow_chunks, pandas_chunks):
+    """
+    Yield arrow's chunks; if arrow rejects a value, carry on from the same
+    row with pandas_chunks(skip_rows).
+    """
+    rows_done = 0
+    try:
+        for chunk, done_bytes in arrow_chunks:
+            rows_done += len(chunk)
+            yield chunk, done_bytes
+    except pa.ArrowInvalid as e:
+        print(f"⚠️  {path.name} doesn't match the {table_name} schema ({e}); "
+              f"reading the rest with pandas.")
+        yield from pandas_chunks(rows_done)
+
+
+# CSV
+
+def _csv_columns(csv_path, table_name):
+    with open(csv_path, "r", encoding="utf-8") as f:
+        return pd.read_csv(f, nrows=0).columns.tolist()
+
+
+def _iter_arrow_csv(csv_path, table_name, columns, chunk_size):
+    """Yield (DataFrame, bytes read so far) chunks parsed by pyarrow."""
+    convert_options = pa_csv.ConvertOptions(
+        column_types=_arrow_types(table_name, columns),
+        include_columns=columns,
+        strings_can_be_null=True,
+    )
+    read_options = pa_csv.ReadOptions(use_threads=True, block_size=PARSER_SETTINGS["block_size"])
+    total_bytes = csv_path.stat().st_size
+
+    if total_bytes <= PARSER_SETTINGS["max_in_memory_mb"] * 1024 * 1024:
+        # All blocks are parsed in parallel
+        table = pa_csv.read_csv(csv_path, read_options=read_options, convert_options=convert_options)
+        done = 0
+        for batch in table.to_batches(max_chunksize=chunk_size):
+            done += batch.num_rows
+            yield _conform_batch(batch, table_name), total_bytes * done // max(table.num_rows, 1)
+        return
+
+    with csv_path.open("rb") as f:
+        reader = pa_csv.open_csv(f, read_options=read_options, convert_options=convert_options)
+        for block in reader:
+            for batch in _slices(block, chunk_size):
+                yield _conform_batch(batch, table_name), f.tell()
+
+
+def _iter_pandas_csv(csv_path, table_name, columns, chunk_size, skip_rows=0):
+    """Yield (DataFrame, bytes read so far) chunks parsed by pandas."""
+    with csv_path.open("rb") as f:
+        reader = pd.read_csv(
+            f,
+            usecols=columns,
+            dtype=_pandas_dtypes(table_name, columns),
+            chunksize=chunk_size,
+            skiprows=range(1, skip_rows + 1) if skip_rows else None,
+        )
+        for chunk in reader:
+            yield chunk, f.tell()
+
+
+def iter_csv_chunks(csv_path, table_name, chunk_size, columns=None, backend=None):
+    """
+    Parse a CSV into DataFrame chunks with the table's explicit schema.
+
+    Args:
+        csv_path: Path to the CSV file
+        table_name: Table the file is for (picks the schema in TABLE_SCHEMAS)
+        chunk_size: Most rows per chunk
+        columns: Only read these columns (default: all of them)
+        backend: "arrow", "pandas" or "auto" (default: PARSER_SETTINGS)
+
+    Yields:
+        tuple: (DataFrame, bytes of the file read so far)
+    """
+    csv_path = Path(csv_path)
+    header = _csv_columns(csv_path, table_name)
+    columns = [col for col in header if columns is None or col in columns]
+
+    if resolve_backend(backend) == "pandas":
+        yield from _iter_pandas_csv(csv_path, table_name, columns, chunk_size)
+        return
+
+    yield from _with_pandas_fallback(
+        csv_path, table_name,
+        _iter_arrow_csv(csv_path, table_name, columns, chunk_size),
+        lambda skip: _iter_pandas_csv(csv_path, table_name, columns, chunk_size, skip_rows=skip),
+    )
+
+
+# JSON Lines
+
+def _jsonl_columns(jsonl_path, table_name):
+    """Keys of the first record, then any schema columns it didn't have."""
+    keys = []
+    with open(jsonl_path, "rb") as f:
+        for line in f:
+            if line.strip():
+                keys = list(json.loads(line))
+                break
+    return keys + [col for col in TABLE_SCHEMAS.get(table_name, {}) if col not in keys]
+
+
+def _iter_arrow_jsonl(jsonl_path, table_name, columns, chunk_size):
+    """Yield (DataFrame, bytes read so far) chunks streamed by pyarrow."""
+    types = _arrow_types(table_name, columns, for_json=True)
+    schema = pa.schema([(col, types.get(col, pa.string())) for col in columns])
+    parse_options = pa_json.ParseOptions(explicit_schema=schema, unexpected_field_behavior="ignore")
+    read_options = pa_json.ReadOptions(use_threads=True, block_size=PARSER_SETTINGS["block_size"])
+
+    with jsonl_path.open("rb") as f:
+        reader = pa_json.open_json(f, read_options=read_options, parse_options=parse_options)
+        for block in reader:
+            for batch in _slices(block, chunk_size):
+                yield _conform_batch(batch, table_name), f.tell()
+
+
+def _iter_pandas_jsonl(jsonl_path, table_name, columns, chunk_size, skip_rows=0):
+    """Yield (DataFrame, bytes read so far) chunks parsed by pandas."""
+    with jsonl_path.open("rb") as f:
+        for _ in range(skip_rows):
+            f.readline()
+        reader = pd.read_json(f, lines=True, chunksize=chunk_size, dtype=False,
+                              convert_dates=False, keep_default_dates=False)
+        for chunk in reader:
+            yield _apply_pandas_schema(chunk, table_name, columns), f.tell()
+
+
+def iter_jsonl_chunks(jsonl_path, table_name, chunk_size, columns=None, backend=None):
+    """
+    Stream a JSON Lines file into DataFrame chunks with the table's schema.
+
+    Keys a record doesn't have become NULL; keys not in columns are ignored.
+    Arguments and yielded values are the same as iter_csv_chunks.
+    """
+    jsonl_path = Path(jsonl_path)
+    columns = [col for col in _jsonl_columns(jsonl_path, table_name) if columns is None or col in columns]
+
+    if resolve_backend(backend) == "pandas":
+        yield from _iter_pandas_jsonl(jsonl_path, table_name, columns, chunk_size)
+        return
+
+    yield from _with_pandas_fallback(
+        jsonl_path, table_name,
+        _iter_arrow_jsonl(jsonl_path, table_name, columns, chunk_size),
+        lambda skip: _iter_pandas_jsonl(jsonl_path, table_name, columns, chunk_size, skip_rows=skip),
+    )
+
+
+# Parquet
+
+def _require_arrow(path):
+    if not arrow_available():
+        raise ImportError(f"Reading {path.name} needs pyarrow (pip install pyarrow).")
+
+
+def _parquet_columns(parquet_path, table_name):
+    """Column names from the file's footer; no data is read."""
+    parquet_path = Path(parquet_path)
+    _require_arrow(parquet_path)
+    return pa_parquet.read_schema(parquet_path).names
+
+
+def iter_parquet_chunks(parquet_path, table_name, chunk_size, columns=None, backend=None):
+    """
+    Read a Parquet file into DataFrame chunks, one row group at a time.
+
+    Only the requested columns are read from disk. Dates stored as text
+    are checked like the other formats, but a row group with a bad date
+    keeps its dates as text (there is no pandas reader to fall back to).
+    Arguments and yielded values are the same as iter_csv_chunks; backend
+    is ignored, Parquet is always read with pyarrow.
+    """
+    parquet_path = Path(parquet_path)
+    _require_arrow(parquet_path)
+    parquet_file = pa_parquet.ParquetFile(parquet_path)
+    names = parquet_file.schema_arrow.names
+    columns = [col for col in names if columns is None or col in columns]
+
+    total_bytes = parquet_path.stat().st_size
+    total_rows = max(parquet_file.metadata.num_rows, 1)
+    done = 0
+    for group in range(parquet_file.num_row_groups):
+        table = parquet_file.read_row_group(group, columns=columns)
+        for batch in table.to_batches(max_chunksize=chunk_size):
+            try:
+                df = _conform_batch(batch, table_name)
+            except pa.ArrowInvalid:
+                df = _conform_batch(batch, table_name, check_dates=False)
+            done += batch.num_rows
+            yield df, total_bytes * done // total_rows
+
+
+FILE_FORMATS = {
+    ".csv": (_csv_columns, iter_csv_chunks),
+    ".jsonl": (_jsonl_columns, iter_jsonl_chunks),
+    ".ndjson": (_jsonl_columns, iter_jsonl_chunks),
+    ".parquet": (_parquet_columns, iter_parquet_chunks),
+}
+
+
+def _file_format(path):
+    suffix = Path(path).suffix.lower()
+    if suffix not in FILE_FORMATS:
+        raise ValueError(f"Unsupported file type '{suffix}' for {Path(path).name} "
+                         f"(expected one of: {', '.join(FILE_FORMATS)})")
+    return FILE_FORMATS[suffix]
+
+
+def read_columns(path, table_name):
+    """
+    Return the column names a file provides, without reading its rows.
+
+    Args:
+        path: CSV, JSONL or Parquet file
+        table_name: Table the file is for
+
+    Returns:
+        list: Column names
+    """
+    columns_reader, _ = _file_format(path)
+    return columns_reader(path, table_name)
+
+
+def iter_file_chunks(path, table_name, chunk_size, columns=None, backend=None):
+    """
+    Parse a CSV, JSONL or Parquet file into DataFrame chunks, by suffix.
+
+    Args:
+        path: Path to the file
+        table_name: Table the file is for (picks the schema in TABLE_SCHEMAS)
+        chunk_size: Most rows per chunk
+        columns: Only read these columns (default: all of them)
+        backend: "arrow", "pandas" or "auto" (default: PARSER_SETTINGS)
+
+    Yields:
+        tuple: (DataFrame, bytes of the file read so far)
+    """
+    _, chunks = _file_format(path)
+    yield from chunks(path, table_name, chunk_size, columns, backend)
+
+
+def _make_benchmark_files(out_dir, rows):
+    """Write rows-long copies of the CW2/DATA CSVs, resampled, with unique keys."""
+    data_dir = Path(__file__).resolve().parents[2] / "DATA"
+    paths = {}
+    for table_name in TABLE_SCHEMAS:
+        sample = pd.read_csv(data_dir / f"{table_name}.csv")
+        df = sample.sample(rows, replace=True, random_state=0).reset_index(drop=True)
+        if table_name == "it_tickets":
+            df["ticket_id"] = [f"TCK-{i}" for i in range(rows)]
+        elif table_name == "datasets_metadata":
+            df["dataset_name"] = [f"dataset_{i}" for i in range(rows)]
+        path = Path(out_dir) / f"{table_name}.csv"
+        df.to_csv(path, index=False)
+        paths[table_name] = path
+    return paths
+
+
+def _time_parse(path, table_name, chunk_size, backend=None, columns=None):
+    start = time.perf_counter()
+    rows = sum(len(chunk) for chunk, _ in iter_file_chunks(path, table_name, chunk_size, columns, backend))
+    return rows, time.perf_counter() - start
+
+
+def _benchmark_backends(paths, chunk_size):
+    backends = ["pandas"] + (["arrow"] if arrow_available() else [])
+    if not arrow_available():
+        print("⚠️  pyarrow isn't installed, only pandas can be timed.")
+
+    print(f"\n{'table':<20}{'MB':>8}" + "".join(f"{name + ' s':>12}" for name in backends) + f"{'speedup':>10}")
+    for table_name, path in paths.items():
+        times = {}
+        for backend in backends:
+            rows, times[backend] = _time_parse(path, table_name, chunk_size, backend)
+        speedup = times["pandas"] / times["arrow"] if "arrow" in times else 1.0
+        print(f"{table_name:<20}{path.stat().st_size / 1e6:>8.1f}"
+              + "".join(f"{times[name]:>12.2f}" for name in backends) + f"{speedup:>9.1f}x")
+
+
+def _benchmark_formats(paths, chunk_size):
+    _require_arrow(Path("benchmark.parquet"))
+    print(f"\n{'table':<20}{'format':<22}{'MB':>8}{'s':>8}{'rows/s':>12}")
+    for table_name, csv_path in paths.items():
+        df = pd.read_csv(csv_path)
+        jsonl_path = csv_path.with_suffix(".jsonl")
+        parquet_path = csv_path.with_suffix(".parquet")
+        df.to_json(jsonl_path, orient="records", lines=True)
+        df.to_parquet(parquet_path, row_group_size=100000, index=False)
+
+        # Parquet again reading only two columns, to show what projection saves
+        key_columns = list(TABLE_SCHEMAS[table_name])[:2]
+        runs = [("csv", csv_path, None), ("jsonl", jsonl_path, None), ("parquet", parquet_path, None),
+                (f"parquet, {len(key_columns)} columns", parquet_path, key_columns)]
+        for label, path, columns in runs:
+            rows, seconds = _time_parse(path, table_name, chunk_size, columns=columns)
+            print(f"{table_name:<20}{label:<22}{path.stat().st_size / 1e6:>8.1f}{seconds:>8.2f}"
+                  f"{rows / seconds:>12,.0f}")
+
+
+if __name__ == "__main__":
+    import argparse
+    import tempfile
+
+    parser = argparse.ArgumentParser(description="Compare the parser backends and file formats")
+    parser.add_argument("--rows", type=int, default=1000000, help="Rows per generated file")
+    parser.add_argument("--chunk-size", type=int, default=50000, help="Rows per chunk")
+    parser.add_argument("--formats", action="store_true",
+                        help="Compare CSV, JSONL and Parquet instead of the CSV backends")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        print(f"Generating {args.rows:,}-row files...")
+        paths = _make_benchmark_files(tmp, args.rows)
+        if args.formats:
+            _benchmark_formats(paths, args.chunk_size)
+        else:
+            _benchmark_backends(paths, args.chunk_size)
@@ -0,0 +1,278 @@
+import re
+import time
+from pathlib import Path
+
+from app.data.bulk import _iter_rows, DEFAULT_CHUNK_SIZE
+from app.data.parsers import iter_file_chunks, read_columns
+
+
+def _table_columns(conn, table_name):
+    """Return the column names of a table, in order."""
+    cur = conn.cursor()
+    cur.execute(f"PRAGMA table_info({table_name})")
+    return [row[1] for row in cur.fetchall()]
+
+
+def _stage_csv(conn, csv_path, table_name, staging_table, columns, chunk_size, progress, parser=None):
+    """
+    Stream a CSV, JSONL or Parquet file into the staging table with
+    executemany, one chunk at a time.
+
+    Each staged row keeps its position in the file in csv_row, so the
+    first of several rows with the same key can be picked later.
+
+    Returns:
+        int: Rows staged
+    """
+    placeholders = ", ".join("?" for _ in range(len(columns) + 1))
+    sql = f"INSERT INTO {staging_table} (csv_row, {', '.join(columns)}) VALUES ({placeholders})"
+
+    total_bytes = csv_path.stat().st_size
+    staged = 0
+    start = time.perf_counter()
+    cur = conn.cursor()
+
+    for chunk, done_bytes in iter_file_chunks(csv_path, table_name, chunk_size, columns, parser):
+        rows = _iter_rows(chunk, columns)
+        cur.executemany(sql, ((staged + i, *row) for i, row in enumerate(rows)))
+        staged += len(chunk)
+
+        if progress:
+            elapsed = time.perf_counter() - start
+            rate = staged / elapsed if elapsed > 0 else 0.0
+            eta = elapsed * (total_bytes - done_bytes) / done_bytes if done_bytes else 0.0
+            progress(staged, rate, eta)
+
+    return staged
+
+
+def load_csv_via_staging(conn, csv_path, table_name, chunk_size=DEFAULT_CHUNK_SIZE, progress=None,
+                         target_table=None, parser=None):
+    """
+    Load a CSV, JSONL or Parquet file through a temporary staging table.
+
+    The file is bulk-loaded into a TEMP table first, then a single
+    INSERT ... SELECT moves the rows into the live table:
+
+    - cyber_incidents: reported_by is resolved against users with a LEFT JOIN
+      (unknown reporters become NULL)
+    - it_tickets: rows with a missing or blank ticket_id are rejected, only
+      the first row per ticket_id in the file is kept, and ticket_ids
+      already in it_tickets are skipped with an anti-join (NOT EXISTS on
+      the unique ticket_id index)
+
+    All lookups happen inside SQLite, so memory doesn't depend on how big
+    the users or it_tickets tables are. The move into the live table is
+    one transaction.
+
+    Args:
+        conn: Database connection
+        csv_path: Path to the CSV, JSONL or Parquet file (picked by suffix)
+        table_name: Name of the target table
+        chunk_size: Rows read from the file and staged at a time
+        progress: Optional callback progress(rows_done, rows_per_sec, eta_seconds)
+        target_table: Table to insert into instead of table_name (used by
+                      reload_table_from_csv to fill the shadow table). It
+                      isn't visible to readers, so it is filled in
+                      chunk_size batches, each committed on its own.
+        parser: Parser backend, "arrow", "pandas" or "auto" (see app.data.parsers)
+
+    Returns:
+        int: Number of rows loaded into the target table
+    """
+    # Parquet only reads these columns from disk
+    header = read_columns(csv_path, table_name)
+
+    target = target_table or table_name
+    table_columns = _table_columns(conn, target)
+    columns = [col for col in header if col in table_columns]
+    ignored = [col for col in header if col not in table_columns]
+    if ignored:
+        print(f"  - {table_name}: ignoring columns not in the table: {', '.join(ignored)}")
+
+    staging_table = f"staging_{table_name}"
+    cur = conn.cursor()
+    cur.execute(f"DROP TABLE IF EXISTS temp.{staging_table}")
+    cur.execute(f"CREATE TEMP TABLE {staging_table} (csv_row INTEGER PRIMARY KEY, {', '.join(columns)})")
+
+    try:
+        staged = _stage_csv(conn, csv_path, table_name, staging_table, columns, chunk_size, progress, parser)
+        # The staged rows are in TEMP storage, so this doesn't touch the live tables
+        conn.commit()
+
+        select_columns = [f"s.{col}" for col in columns]
+        joins = []
+        conditions = []
+        dropped_in_csv = 0
+        skipped_existing = 0
+        rejected = 0
+        row_cnt = 0
+
+        if table_name == "cyber_incidents" and "reported_by" in columns:
+            # Unknown reporters become NULL instead of breaking the foreign key
+            joins.append("LEFT JOIN users u ON u.username = TRIM(s.reported_by)")
+            select_columns[columns.index("reported_by")] = "u.username"
+
+        if table_name == "it_tickets" and "ticket_id" in columns:
+            cur.execute(f"CREATE INDEX temp.idx_{staging_table}_ticket ON {staging_table}(ticket_id, csv_row)")
+
+            # First row per ticket_id in the file
+            first_in_file = (
+                f"s.csv_row = (SELECT MIN(s2.csv_row) FROM {staging_table} s2 "
+                f"WHERE s2.ticket_id = s.ticket_id)"
+            )
+            not_in_db = f"NOT EXISTS (SELECT 1 FROM {target} t WHERE t.ticket_id = s.ticket_id)"
+
+            # ticket_id is NOT NULL in the table, and blank ones can't be deduped
+            has_id = "TRIM(s.ticket_id) <> ''"
+            cur.execute(f"SELECT COUNT(*) FROM {staging_table} s WHERE NOT COALESCE({has_id}, 0)")
+            rejected = cur.fetchone()[0]
+            cur.execute(
+                f"SELECT COUNT(*) - COUNT(DISTINCT ticket_id) FROM {staging_table} s WHERE {has_id}"
+            )
+            dropped_in_csv = cur.fetchone()[0]
+            cur.execute(f"SELECT COUNT(*) FROM {staging_table} s WHERE {first_in_file} AND NOT {not_in_db}")
+            skipped_existing = cur.fetchone()[0]
+
+            conditions.extend([has_id, first_in_file, not_in_db])
+
+        insert_sql = f"""
+            INSERT INTO {target} ({', '.join(columns)})
+            SELECT {', '.join(select_columns)}
+            FROM {staging_table} s {' '.join(joins)}
+            WHERE {' AND '.join(conditions + ['s.csv_row BETWEEN ? AND ?'])}
+            ORDER BY s.csv_row
+            """
+
+        # A live table gets every row in one transaction; a shadow table is
+        # filled in batches so other writers aren't locked out for the whole load
+        batch = max(1, staged if target_table is None else chunk_size)
+        for first_row in range(0, staged, batch):
+            cur.execute("BEGIN IMMEDIATE")
+            cur.execute(insert_sql, (first_row, first_row + batch - 1))
+            row_cnt += cur.rowcount
+            conn.commit()
+    except Exception:
+        if conn.in_transaction:
+            conn.rollback()
+        raise
+    finally:
+        cur.execute(f"DROP TABLE IF EXISTS temp.{staging_table}")
+
+    if dropped_in_csv or skipped_existing:
+        print(f"  - {table_name}: dropped {dropped_in_csv} duplicate rows from the file; "
+              f"skipped {skipped_existing} rows that already exist in DB.")
+    if rejected:
+        print(f"⚠️  {table_name}: rejected {rejected} rows with no ticket_id in {csv_path.name}.")
+
+    if row_cnt == 0:
+        print(f"No new rows to insert into {target} from {csv_path.name} ({staged} staged).")
+        return 0
+
+    print(f"✅ Loaded {row_cnt} rows from {csv_path.name} into {target}.")
+    return row_cnt
+
+
+def _shadow_name(name):
+    """Name for the shadow copy of an index: alternates between name and name__new."""
+    return name[:-len("__new")] if name.endswith("__new") else f"{name}__new"
+
+
+def reload_table_from_csv(conn, csv_path, table_name, chunk_size=DEFAULT_CHUNK_SIZE, progress=None,
+                          parser=None):
+    """
+    Replace everything in a table with the contents of a CSV (or JSONL /
+    Parquet) file, atomically.
+
+    1. <table>__new is created with the same definition and filled through
+       the staging table, in short batches (readers keep using <table>).
+    2. The table's indexes are built on <table>__new.
+    3. One short transaction renames <table> to <table>__old and
+       <table>__new to <table>, and moves the table's triggers across.
+       Readers see either all the old rows or all the new ones.
+    4. <table>__old is dropped afterwards.
+
+    Args:
+        conn: Database connection
+        csv_path: Path to the CSV, JSONL or Parquet file
+        table_name: Table to replace
+        chunk_size: Rows per staging / insert batch
+        progress: Optional callback progress(rows_done, rows_per_sec, eta_seconds)
+        parser: Parser backend (see app.data.parsers)
+
+    Returns:
+        int: Number of rows in the table after the swap
+    """
+    csv_path = Path(csv_path)
+    if not csv_path.exists():
+        print(f"⚠️  File not found: {csv_path}, {table_name} can't be reloaded.")
+        return 0
+
+    shadow = f"{table_name}__new"
+    old = f"{table_name}__old"
+    cur = conn.cursor()
+
+    cur.execute("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = ?", (table_name,))
+    row = cur.fetchone()
+    if row is None:
+        raise ValueError(f"Unknown table: {table_name}")
+    table_sql = re.sub(rf"^(CREATE TABLE\s+(?:IF NOT EXISTS\s+)?)[\"`\[]?{table_name}[\"`\]]?",
+                       rf"\g<1>{shadow}", row[0].strip(), count=1, flags=re.IGNORECASE)
+
+    cur.execute(
+        "SELECT name, sql FROM sqlite_master WHERE type = 'index' AND tbl_name = ? AND sql IS NOT NULL",
+        (table_name,)
+    )
+    indexes = cur.fetchall()
+    cur.execute("SELECT name, sql FROM sqlite_master WHERE type = 'trigger' AND tbl_name = ?", (table_name,))
+    triggers = cur.fetchall()
+
+    # A previous reload may have stopped half way
+    cur.execute(f"DROP TABLE IF EXISTS {shadow}")
+    cur.execute(f"DROP TABLE IF EXISTS {old}")
+    cur.execute(table_sql)
+    conn.commit()
+
+    start = time.perf_counter()
+    try:
+        load_csv_via_staging(conn, csv_path, table_name, chunk_size, progress, target_table=shadow,
+                             parser=parser)
+
+        # Build the indexes after the data is in; each one is its own transaction
+        for name, sql in indexes:
+            index_sql = re.sub(rf"\b{name}\b", _shadow_name(name), sql, count=1)
+            index_sql = re.sub(rf"\bON\s+[\"`\[]?{table_name}[\"`\]]?", f"ON {shadow}", index_sql,
+                               count=1, flags=re.IGNORECASE)
+            cur.execute(index_sql)
+            conn.commit()
+    except Exception:
+        if conn.in_transaction:
+            conn.rollback()
+        cur.execute(f"DROP TABLE IF EXISTS {shadow}")
+        conn.commit()
+        raise
+
+    # The swap: only renames and trigger definitions, so the lock is brief
+    swap_start = time.perf_counter()
+    try:
+        cur.execute("BEGIN IMMEDIATE")
+        for name, _ in triggers:
+            cur.execute(f"DROP TRIGGER IF EXISTS {name}")
+        cur.execute(f"ALTER TABLE {table_name} RENAME TO {old}")
+        cur.execute(f"ALTER TABLE {shadow} RENAME TO {table_name}")
+        for _, sql in triggers:
+            cur.execute(sql)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    swap_ms = (time.perf_counter() - swap_start) * 1000
+
+    cur.execute(f"DROP TABLE IF EXISTS {old}")
+    conn.commit()
+
+    cur.execute(f"SELECT COUNT(*) FROM {table_name}")
+    row_cnt = cur.fetchone()[0]
+    print(f"✅ Reloaded {table_name} with {row_cnt} rows from {csv_path.name} in "
+          f"{time.perf_counter() - start:.2f}s (swap held the lock for {swap_ms:.1f} ms).")
+    return row_cnt
@@ -2,6 +2,7 @@ import pandas as pd
 from pathlib import Path
 from app.data.db import connect_database
 from app.data.incidents import load_csv_to_table
+from app.data.bulk import insert_many, DEFAULT_CHUNK_SIZE
 
 
 def load_tickets_csv(conn, csv_path):
@@ -27,6 +28,20 @@ def insert_ticket(conn, ticket_id, priority, status, category, subject, descript
     return cur.lastrowid
 
 
+def insert_tickets_many(conn, records, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Insert many IT tickets in one transaction.
+
+    records can be a DataFrame or an iterable of dicts / tuples with the columns
+    (ticket_id, priority, status, category, subject, description,
+     created_date, resolved_date, assigned_to).
+    Returns the list of inserted IDs.
+    """
+    columns = ["ticket_id", "priority", "status", "category", "subject", "description",
+               "created_date", "resolved_date", "assigned_to"]
+    return insert_many(conn, "it_tickets", columns, records, chunk_size)
+
+
 def get_all_tickets(conn):
     """Return a DataFrame of all tickets."""
     return pd.read_sql_query("SELECT * FROM it_tickets ORDER BY id DESC", conn)
@@ -0,0 +1,407 @@
+"""
+Watch-folder ingest worker.
+
+Watches a folder for CSV and JSONL exports and loads new files, and lines
+appended to files it has already seen, in micro-batches through the
+per-table bulk loaders. The file name says which table a file is for:
+it has to start with the table name, e.g. it_tickets_2025-06-01.csv or
+cyber_incidents.siem.jsonl.
+
+After every batch the byte offset reached is saved in ingest_checkpoints
+in the same transaction as the rows, so a restart carries on exactly
+where it stopped, without loading a line twice or skipping one.
+
+When SQLite is busy the worker backs off (sleeping longer each time) and
+retries with smaller batches, growing them again once writes go through.
+
+A batch that fails for any other reason is retried one record at a time;
+a record that still fails after max_attempts is moved to
+<folder>/rejected/<file name> and skipped, so one bad line can't stall
+the file.
+
+Usage:
+    python -m app.services.ingest_worker DATA/inbox
+"""
+
+import io
+import sqlite3
+import time
+from pathlib import Path
+
+import pandas as pd
+
+from app.data.db import DB_PATH
+from app.data.incidents import insert_incidents_many, _validate_chunk, _drop_existing_rows
+from app.data.tickets import insert_tickets_many
+from app.data.datasets import insert_datasets_many
+from app.data.migrations import migrate
+
+WORKER_SETTINGS = {
+    # Seconds between folder scans when there is nothing to do
+    "poll_interval": 2.0,
+    # Lines per micro-batch (shrinks while SQLite is busy)
+    "batch_lines": 5000,
+    "min_batch_lines": 100,
+    # Seconds SQLite waits for a lock before reporting busy
+    "busy_timeout": 1.0,
+    # Back-off after a busy error: first wait, and the longest wait
+    "backoff_initial": 0.5,
+    "backoff_max": 30.0,
+    # Tries for a failing record before it is moved to the rejects folder
+    "max_attempts": 3,
+}
+
+LOADERS = {
+    "cyber_incidents": insert_incidents_many,
+    "it_tickets": insert_tickets_many,
+    "datasets_metadata": insert_datasets_many,
+}
+
+SUFFIXES = {".csv", ".jsonl"}
+
+REJECTS_FOLDER = "rejected"
+
+# Files with a batch that failed: path -> {"until": end of that batch,
+# "offset": record being retried, "attempts": tries at that offset}
+_failing = {}
+
+
+class DatabaseBusy(Exception):
+    """SQLite was locked by another writer; try the batch again later."""
+
+
+def table_for_file(path):
+    """Return the table a file should be loaded into, or None."""
+    path = Path(path)
+    if path.suffix.lower() not in SUFFIXES:
+        return None
+    for table in LOADERS:
+        if path.name.startswith(table):
+            return table
+    return None
+
+
+def _get_checkpoint(conn, path):
+    """Return (byte_offset, header, rows_loaded) for a file, or None if it's new."""
+    cur = conn.cursor()
+    cur.execute(
+        "SELECT byte_offset, header, rows_loaded FROM ingest_checkpoints WHERE path = ?",
+        (str(path),)
+    )
+    return cur.fetchone()
+
+
+def _read_batch(path, offset, max_records, is_csv):
+    """
+    Read up to max_records complete records starting at offset.
+
+    A JSON Lines record is one line. A CSV record ends at a newline that
+    isn't inside quotes, so a quoted field spanning several lines stays in
+    one batch (an even number of quote characters so far means we're
+    outside quotes; an escaped "" doesn't change that).
+
+    A last record without its newline is left for later; the exporter may
+    still be writing it.
+
+    Returns:
+        tuple: (bytes read, number of records, offset after the last complete record)
+    """
+    records = []
+    pending = []
+    quotes = 0
+    end = offset
+    with open(path, "rb") as f:
+        f.seek(offset)
+        for line in f:
+            if not line.endswith(b"\n"):
+                break
+            pending.append(line)
+            if is_csv:
+                quotes += line.count(b'"')
+                if quotes % 2:
+                    continue
+            record = b"".join(pending)
+            records.append(record)
+            end += len(record)
+            pending, quotes = [], 0
+            if len(records) >= max_records:
+                break
+    return b"".join(records), len(records), end
+
+
+def _parse_batch(data, header, is_jsonl):
+    """Turn a batch of raw lines into a DataFrame."""
+    if is_jsonl:
+        return pd.read_json(io.BytesIO(data), lines=True, dtype=False)
+    return pd.read_csv(io.BytesIO(header.encode("utf-8") + data))
+
+
+def _known_users(conn, names, batch=500):
+    """Return which of names are usernames (only these are looked up)."""
+    names = [n for n in names if isinstance(n, str)]
+    found = set()
+    cur = conn.cursor()
+    for i in range(0, len(names), batch):
+        part = names[i:i + batch]
+        cur.execute(f"SELECT username FROM users WHERE username IN ({', '.join('?' for _ in part)})", part)
+        found.update(row[0] for row in cur.fetchall())
+    return found
+
+
+def _table_columns(conn, table_name):
+    """Columns a loader fills (everything but id and created_at)."""
+    cur = conn.cursor()
+    cur.execute(f"PRAGMA table_info({table_name})")
+    return [row[1] for row in cur.fetchall() if row[1] not in ("id", "created_at")]
+
+
+def _save_checkpoint(conn, path, table_name, new_offset, header, rows):
+    """Move a file's checkpoint (in the caller's transaction)."""
+    conn.execute(
+        """
+        INSERT INTO ingest_checkpoints (path, table_name, byte_offset, header, rows_loaded)
+        VALUES (?, ?, ?, ?, ?)
+        ON CONFLICT(path) DO UPDATE SET
+            byte_offset = excluded.byte_offset,
+            header = excluded.header,
+            rows_loaded = rows_loaded + excluded.rows_loaded,
+            updated_at = CAST(strftime('%s', 'now') AS INTEGER)
+        """,
+        (str(path), table_name, new_offset, header, rows)
+    )
+
+
+def _begin(conn):
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+    except sqlite3.OperationalError as e:
+        raise DatabaseBusy(str(e)) from e
+
+
+def _load_batch(conn, path, table_name, df, new_offset, header):
+    """
+    Validate a batch, insert it and move the checkpoint, all in one transaction.
+
+    Returns:
+        int: Rows inserted
+    """
+    df = df.reindex(columns=_table_columns(conn, table_name))
+    _begin(conn)
+
+    try:
+        users = set()
+        if table_name == "cyber_incidents":
+            users = _known_users(conn, df["reported_by"].dropna().astype(str).str.strip().unique())
+        df, _, rejected = _validate_chunk(df, table_name, users)
+        df, _ = _drop_existing_rows(conn, df, table_name)
+        if rejected:
+            print(f"⚠️  {path.name}: rejected {rejected} records with no ticket_id")
+
+        rows = len(LOADERS[table_name](conn, df)) if len(df) > 0 else 0
+
+        _save_checkpoint(conn, path, table_name, new_offset, header, rows)
+        conn.commit()
+        return rows
+    except sqlite3.OperationalError as e:
+        conn.rollback()
+        if "locked" in str(e) or "busy" in str(e):
+            raise DatabaseBusy(str(e)) from e
+        raise
+    except Exception:
+        conn.rollback()
+        raise
+
+
+def ingest_available(conn, path, batch_lines):
+    """
+    Load one micro-batch of whatever is new in a file.
+
+    Returns:
+        tuple: (rows inserted, lines consumed); (0, 0) when caught up
+    """
+    path = Path(path).resolve()
+    table_name = table_for_file(path)
+    is_jsonl = path.suffix.lower() == ".jsonl"
+
+    checkpoint = _get_checkpoint(conn, path)
+    offset, header = (checkpoint[0], checkpoint[1]) if checkpoint else (0, None)
+
+    size = path.stat().st_size
+    if size < offset:
+        # The file was replaced by a shorter one; start it again
+        print(f"⚠️  {path.name} is shorter than its checkpoint, reading it from the start")
+        offset, header = 0, None
+        _failing.pop(str(path), None)
+    if size == offset:
+        return 0, 0
+
+    # A CSV's first line is its header; remember it with the checkpoint
+    if not is_jsonl and header is None:
+        data, count, end = _read_batch(path, offset, 1, is_csv=True)
+        if count == 0:
+            return 0, 0
+        header, offset = data.decode("utf-8"), end
+        if size == offset:
+            # Only a header so far; it's read again once rows arrive
+            return 0, 0
+
+    # After a failed batch, go through it one record at a time
+    failing = _failing.get(str(path))
+    careful = failing is not None and offset < failing["until"]
+    if failing is not None and not careful:
+        del _failing[str(path)]
+
+    data, count, end = _read_batch(path, offset, 1 if careful else batch_lines, is_csv=not is_jsonl)
+    if count == 0:
+        return 0, 0
+
+    try:
+        df = _parse_batch(data, header, is_jsonl)
+        rows = _load_batch(conn, path, table_name, df, end, header)
+    except DatabaseBusy:
+        raise
+    except Exception as e:
+        if not careful:
+            _failing[str(path)] = {"until": end, "offset": offset, "attempts": 0}
+            raise
+        if failing["offset"] != offset:
+            failing.update(offset=offset, attempts=0)
+        failing["attempts"] += 1
+        if failing["attempts"] < WORKER_SETTINGS["max_attempts"]:
+            raise
+        _quarantine(conn, path, table_name, data, end, header, e)
+        return 0, count
+    return rows, count
+
+
+def _quarantine(conn, path, table_name, data, end, header, error):
+    """Move a record that keeps failing to the rejects folder and skip past it."""
+    rejects_dir = path.parent / REJECTS_FOLDER
+    rejects_dir.mkdir(exist_ok=True)
+    rejects_path = rejects_dir / path.name
+    with open(rejects_path, "ab") as f:
+        # A CSV rejects file gets the header, so it can be fixed and dropped back in
+        if header is not None and f.tell() == 0:
+            f.write(header.encode("utf-8"))
+        f.write(data)
+
+    _begin(conn)
+    try:
+        _save_checkpoint(conn, path, table_name, end, header, 0)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    print(f"⚠️  Moved a record of {path.name} that keeps failing to {rejects_path} ({error})")
+
+
+def run_once(conn, folder, batch_lines=None):
+    """
+    Load everything new in the folder right now, then return.
+
+    Returns:
+        int: Rows inserted
+    """
+    batch_lines = batch_lines or WORKER_SETTINGS["batch_lines"]
+    total = 0
+    for path in sorted(Path(folder).iterdir()):
+        if not path.is_file() or table_for_file(path) is None:
+            continue
+        errors = 0
+        while True:
+            try:
+                rows, lines = ingest_available(conn, path, batch_lines)
+            except DatabaseBusy:
+                raise
+            except Exception as e:
+                # Failing records are retried one by one and then rejected
+                # by ingest_available; give up on the file if that fails too
+                print(f"⚠️  Error loading {path.name}: {e}")
+                errors += 1
+                if errors > WORKER_SETTINGS["max_attempts"] + 1:
+                    break
+                continue
+            errors = 0
+            total += rows
+            if lines == 0:
+                break
+    return total
+
+
+def run_forever(folder, db_path=DB_PATH, stop=None):
+    """
+    Watch a folder and keep loading from it until stop() returns True.
+
+    Args:
+        folder: Folder the exports are dropped into
+        db_path: Database to load into
+        stop: Optional callable checked between batches
+    """
+    conn = sqlite3.connect(str(db_path), timeout=WORKER_SETTINGS["busy_timeout"])
+    conn.execute("PRAGMA foreign_keys = ON;")
+    conn.execute("PRAGMA journal_mode = WAL;")
+    migrate(conn)
+
+    batch_lines = WORKER_SETTINGS["batch_lines"]
+    backoff = WORKER_SETTINGS["backoff_initial"]
+    print(f"👀 Watching {Path(folder).resolve()} for new exports...")
+
+    try:
+        while not (stop and stop()):
+            worked = False
+            try:
+                for path in sorted(Path(folder).iterdir()):
+                    if stop and stop():
+                        break
+                    if not path.is_file() or table_for_file(path) is None:
+                        continue
+                    try:
+                        rows, lines = ingest_available(conn, path, batch_lines)
+                    except (DatabaseBusy, KeyboardInterrupt):
+                        raise
+                    except Exception as e:
+                        # A bad file shouldn't stop the others; it's retried next scan
+                        print(f"⚠️  Error loading {path.name}: {e}")
+                        continue
+                    if lines:
+                        worked = True
+                        if rows:
+                            print(f"  + {path.name}: {rows} rows")
+
+                # Writes are going through; let batches grow back
+                batch_lines = min(WORKER_SETTINGS["batch_lines"], batch_lines * 2)
+                backoff = WORKER_SETTINGS["backoff_initial"]
+            except DatabaseBusy:
+                # Someone else holds the write lock: wait, then retry with less
+                batch_lines = max(WORKER_SETTINGS["min_batch_lines"], batch_lines // 2)
+                print(f"  ... database busy, waiting {backoff:.1f}s (batch {batch_lines} lines)")
+                time.sleep(backoff)
+                backoff = min(WORKER_SETTINGS["backoff_max"], backoff * 2)
+                continue
+
+            # Only sleep when everything has been caught up
+            if not worked:
+                time.sleep(WORKER_SETTINGS["poll_interval"])
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Load CSV/JSONL exports dropped into a folder")
+    parser.add_argument("folder", help="Folder to watch")
+    parser.add_argument("--once", action="store_true", help="Load what's there now and exit")
+    args = parser.parse_args()
+
+    if args.once:
+        from app.data.db import connect_database
+        conn = connect_database()
+        migrate(conn)
+        print(f"✅ Loaded {run_once(conn, args.folder)} rows")
+        conn.close()
+    else:
+        try:
+            run_forever(args.folder)
+        except KeyboardInterrupt:
+            print("\nStopped.")
@@ -1,10 +1,38 @@
+import os
 import sqlite3
+import time
 import bcrypt
+import pandas as pd
 from pathlib import Path
 from app.data.db import connect_database
+from app.data.bulk import DEFAULT_CHUNK_SIZE
+from app.data.incidents import print_progress
 from app.data.users import get_user_by_username, insert_user
 from app.data.schema import create_users_table
 
+# bcrypt cost; use the same BCRYPT_ROUNDS as the dashboard
+# (calibrate it with: python -m app.auth --target-ms 250 in Final_project)
+BCRYPT_ROUNDS = int(os.environ.get("BCRYPT_ROUNDS", 12))
+
+# $2a$/$2b$/$2y$, two-digit cost, 22-character salt + 31-character hash
+BCRYPT_HASH_PATTERN = r"\$2[aby]\$\d\d\$[./A-Za-z0-9]{53}"
+
+USER_FILE_COLUMNS = ["line", "username", "password_hash", "role", "fields"]
+
+
+def hash_password(password, rounds=None):
+    """Hash a password with bcrypt using the configured cost."""
+    salt = bcrypt.gensalt(rounds or BCRYPT_ROUNDS)
+    return bcrypt.hashpw(password.encode('utf-8'), salt).decode('utf-8')
+
+
+def _hash_rounds(password_hash):
+    """Return the cost stored in a bcrypt hash, or None if it isn't one."""
+    parts = password_hash.split('$')
+    if len(parts) < 4 or not parts[2].isdigit():
+        return None
+    return int(parts[2])
+
 def register_user(username, password, role="user"):
     """
     Register a new user in the database.
@@ -27,10 +55,7 @@ def register_user(username, password, role="user"):
         return False, f"Username '{username}' already exists."
     
     # Hash the password
-    password_bytes = password.encode('utf-8')
-    salt = bcrypt.gensalt()
-    hashed = bcrypt.hashpw(password_bytes, salt)
-    password_hash = hashed.decode('utf-8')
+    password_hash = hash_password(password)
     
     # Insert new user
     cursor.execute(
@@ -73,16 +98,86 @@ def login_user(username, password):
     hash_bytes = stored_hash.encode('utf-8')
     
     if bcrypt.checkpw(password_bytes, hash_bytes):
+        # Rehash with the current cost if the stored one is different
+        # (a hash whose cost can't be read is left alone)
+        rounds = _hash_rounds(stored_hash)
+        if rounds is not None and rounds != BCRYPT_ROUNDS:
+            conn = connect_database()
+            conn.execute(
+                "UPDATE users SET password_hash = ? WHERE id = ?",
+                (hash_password(password), user[0])
+            )
+            conn.commit()
+            conn.close()
         return True, f"Welcome, {username}!"
     else:
         return False, "Invalid password."
 
 
-def migrate_users_from_file(filepath='DATA/users.txt'):
+def _read_user_lines(f, chunk_size):
+    """
+    Yield DataFrames of up to chunk_size user lines from a binary file:
+    line number, username, password_hash and role (None if not given).
+    """
+    rows = []
+    for line_no, raw_line in enumerate(f, start=1):
+        line = raw_line.decode("utf-8", errors="replace").strip()
+        if not line:
+            continue
+        parts = [p.strip() for p in line.split(",")]
+        rows.append((
+            line_no,
+            parts[0],
+            parts[1] if len(parts) > 1 else None,
+            parts[2] if len(parts) > 2 and parts[2] else None,
+            len(parts),
+        ))
+        if len(rows) >= chunk_size:
+            yield pd.DataFrame(rows, columns=USER_FILE_COLUMNS)
+            rows = []
+    if rows:
+        yield pd.DataFrame(rows, columns=USER_FILE_COLUMNS)
+
+
+def _validate_user_chunk(df):
+    """
+    Check a chunk of user lines in one pass per rule.
+
+    Returns:
+        tuple: (valid rows, rejected rows with a 'reason' column)
+    """
+    reason = pd.Series(None, index=df.index, dtype=object)
+    reason[~df["password_hash"].fillna("").str.fullmatch(BCRYPT_HASH_PATTERN)] = "invalid bcrypt hash"
+    reason[df["fields"] > 3] = "too many fields"
+    reason[df["password_hash"].isna()] = "missing password hash"
+    reason[df["username"] == ""] = "missing username"
+
+    rejected = df[reason.notna()].assign(reason=reason[reason.notna()])
+    return df[reason.isna()], rejected
+
+
+def migrate_users_from_file(filepath='DATA/users.txt', role="user", chunk_size=DEFAULT_CHUNK_SIZE,
+                            progress=print_progress, rejects_path=None):
     """
     Migrate users from text file to database.
 
-    File format: username,password_hash
+    File format: username,password_hash[,role]
+
+    The file is streamed in chunks, so memory doesn't grow with its size.
+    Each chunk is validated (bcrypt hash format, missing fields) and
+    inserted with one executemany in its own transaction. Usernames that
+    are already in the database are left alone.
+
+    Args:
+        filepath: Path to the users file
+        role: Role for lines that don't give one
+        chunk_size: Lines per chunk
+        progress: Optional callback progress(rows_done, rows_per_sec, eta_seconds)
+        rejects_path: CSV listing rejected lines and why
+                      (default: <file name>.rejects.csv next to the file)
+
+    Returns:
+        int: Number of users migrated
     """
     path = Path(filepath)
     resolved = path.resolve()
@@ -93,34 +188,60 @@ def migrate_users_from_file(filepath='DATA/users.txt'):
         print("   No users to migrate.")
         return 0
 
+    rejects_path = Path(rejects_path) if rejects_path else resolved.with_suffix(".rejects.csv")
+
     conn = connect_database()
     try:
         cursor = conn.cursor()
         migrated_count = 0
+        rows_done = 0
+        rejected_count = 0
+        already_present = 0
+        total_bytes = resolved.stat().st_size
+        start = time.perf_counter()
+
+        with resolved.open("rb") as f:
+            for chunk in _read_user_lines(f, chunk_size):
+                valid, rejected = _validate_user_chunk(chunk)
 
-        with resolved.open("r", encoding="utf-8") as f:
-            for line in f:
-                line = line.strip()
-                if not line:
-                    continue
-                parts = [p.strip() for p in line.split(",")]
-                if len(parts) < 2:
-                    continue
-                username = parts[0]
-                password_hash = parts[1]
-
-                try:
-                    cursor.execute(
-                        "INSERT OR IGNORE INTO users (username, password_hash, role) VALUES (?, ?, ?)",
-                        (username, password_hash, "users"),
+                if len(rejected) > 0:
+                    rejected[["line", "username", "reason"]].to_csv(
+                        rejects_path, mode="a" if rejected_count else "w",
+                        header=not rejected_count, index=False
                     )
-                    if cursor.rowcount > 0:
-                        migrated_count += 1
-                except sqlite3.Error as e:
-                    print(f"Error migrating user {username}: {e}")
+                    rejected_count += len(rejected)
+
+                if len(valid) > 0:
+                    records = zip(valid["username"].tolist(), valid["password_hash"].tolist(),
+                                  valid["role"].where(valid["role"].notna(), role).tolist())
+                    try:
+                        cursor.execute("BEGIN")
+                        cursor.executemany(
+                            "INSERT OR IGNORE INTO users (username, password_hash, role) VALUES (?, ?, ?)",
+                            records,
+                        )
+                        conn.commit()
+                    except sqlite3.Error as e:
+                        conn.rollback()
+                        print(f"Error migrating lines {valid['line'].iloc[0]}-{valid['line'].iloc[-1]}: {e}")
+                    else:
+                        # rowcount is the total for the whole executemany
+                        migrated_count += cursor.rowcount
+                        already_present += len(valid) - cursor.rowcount
+
+                rows_done += len(chunk)
+                if progress:
+                    elapsed = time.perf_counter() - start
+                    rate = rows_done / elapsed if elapsed > 0 else 0.0
+                    done_bytes = f.tell()
+                    eta = elapsed * (total_bytes - done_bytes) / done_bytes if done_bytes else 0.0
+                    progress(rows_done, rate, eta)
 
-        conn.commit()
         print(f"✅ Migrated {migrated_count} users from {resolved.name}")
+        if already_present:
+            print(f"   - {already_present} users were already in the database")
+        if rejected_count:
+            print(f"⚠️  Rejected {rejected_count} lines, see {rejects_path}")
         return migrated_count
     finally:
-        conn.close()
\ No newline at end of file
+        conn.close()
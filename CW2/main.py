@@ -1,19 +1,39 @@
+import sqlite3
+import time
 import pandas as pd
 from pathlib import Path
 from app.data.db import connect_database, DB_PATH
 from app.data.schema import create_all_tables
+from app.data.migrations import migrate, check_query_plans
 from app.services.user_service import register_user, login_user, migrate_users_from_file
 from app.data.datasets import *
 from app.data.incidents import *
 from app.data.tickets import *
+from app.data.parallel_load import load_tables_parallel, print_load_timings
+from app.data.staging import reload_table_from_csv
+from app.data.manifest import ingest_file
 
 DATA_direc = Path("CW2\DATA")
 
 
-def load_all_csv_data(conn):
+def load_all_csv_data(conn, parallel=False, reload=False, incremental=True):
     """
     Load CSVs found in the DATA directory into their corresponding tables.
 
+    If parallel is True the files are parsed at the same time in a process
+    pool and this thread writes the chunks, so the load takes about as long
+    as the slowest file. A per-table timing breakdown is printed.
+
+    If reload is True each table is replaced by its CSV instead of appended
+    to: a shadow table is built and swapped in atomically, so dashboards
+    never see a half-loaded table.
+
+    Otherwise, if incremental is True, the ingestion manifest decides what
+    to do with each file: unchanged files are skipped, files that only grew
+    have just their new lines loaded, and rewritten files are loaded again
+    with the usual de-duplication (nothing already in the table is removed;
+    use reload=True to replace tables).
+
     Returns total number of rows loaded.
     """
     total = 0
@@ -23,9 +43,26 @@ def load_all_csv_data(conn):
         DATA_direc / "it_tickets.csv": "it_tickets",
     }
 
+    if reload:
+        for path, table in mapping.items():
+            try:
+                total += reload_table_from_csv(conn, path, table)
+            except Exception as e:
+                print(f"Error reloading {table} from {path.name}: {e}")
+        return total
+
+    if parallel:
+        start = time.perf_counter()
+        timings = load_tables_parallel(conn, mapping)
+        print_load_timings(timings, time.perf_counter() - start)
+        return sum(stats["rows"] for stats in timings.values())
+
     for path, table in mapping.items():
         try:
-            rows = load_csv_to_table(conn, path, table)
+            if incremental:
+                _, rows = ingest_file(conn, path, table)
+            else:
+                rows = load_csv_to_table(conn, path, table)
             total += rows
         except Exception as e:
             print(f"Error loading {path.name} into {table}: {e}")
@@ -55,6 +92,9 @@ def setup_database_complete():
         # Step 2: Create tables
         print("\n[2/5] Creating database tables...")
         create_all_tables(conn)
+        applied = migrate(conn)
+        if not applied:
+            print("       Schema is up to date")
 
         # Step 3: Migrate users (function manages its own DB connection)
         print("\n[3/5] Migrating users from users.txt...")
@@ -94,6 +134,38 @@ def setup_database_complete():
     print("\nYou're ready for Week 9 (Streamlit web interface)!")
 
 
+def compare_insert_throughput(n_rows=10000):
+    """
+    Compare row-at-a-time insert_incident() with insert_incidents_many()
+    on a throwaway in-memory database.
+
+    Returns:
+        tuple: (single_rows_per_sec, bulk_rows_per_sec)
+    """
+    rows = [
+        ("2024-11-05", "Phishing", "Low", "Open", f"Benchmark incident {i}", None)
+        for i in range(n_rows)
+    ]
+
+    mem_conn = sqlite3.connect(":memory:")
+    create_all_tables(mem_conn)
+
+    start = time.perf_counter()
+    for row in rows:
+        insert_incident(mem_conn, *row)
+    single_rate = n_rows / (time.perf_counter() - start)
+
+    start = time.perf_counter()
+    insert_incidents_many(mem_conn, rows)
+    bulk_rate = n_rows / (time.perf_counter() - start)
+
+    mem_conn.close()
+
+    print(f"  Row-at-a-time: {single_rate:,.0f} rows/s")
+    print(f"  Batched:       {bulk_rate:,.0f} rows/s")
+    return single_rate, bulk_rate
+
+
 def run_comprehensive_tests():
     """
     Run comprehensive tests on your database.
@@ -152,8 +224,26 @@ def run_comprehensive_tests():
     df_high = get_high_severity_by_status(conn)
     print(f"  High Severity: Found {len(df_high)} status categories")
     
+    # Test 4: Every shipped query should be answered from an index
+    print("\n[TEST 4] Query Plans")
+    full_scans = []
+    for name, (uses_index, plan) in check_query_plans(conn).items():
+        print(f"  {name}: {'✅' if uses_index else '❌'} {plan}")
+        if not uses_index:
+            full_scans.append(name)
+    
     conn.close()
     
+    if full_scans:
+        print("\n" + "="*60)
+        print(f"❌ TESTS FAILED: {', '.join(full_scans)} scan a whole table")
+        print("="*60)
+        raise SystemExit(1)
+    
+    # Test 5: Bulk insert throughput
+    print("\n[TEST 5] Bulk Insert Throughput")
+    compare_insert_throughput()
+    
     print("\n" + "="*60)
     print("✅ ALL TESTS PASSED!")
     print("="*60)
@@ -6,6 +6,9 @@ This is the main entry point with login and registration functionality.
 
 import streamlit as st
 from app.auth import authenticate_user, register_user, validate_username, validate_password
+from app.auth_executor import AuthExecutorBusy
+from app.throttle import LoginThrottled
+from app.components import start_session, restore_session
 
 
 # Configure the page
@@ -28,8 +31,8 @@ st.title("🔐 Multi-Domain Intelligence Platform")
 st.write("Welcome! Please login or register to access the dashboards.")
 st.write("---")
 
-# If user is already logged in, show a message and redirect option
-if st.session_state.logged_in and st.session_state.user_info:
+# If user is already logged in (valid session token), show a message and redirect option
+if restore_session():
     st.success(f"You are already logged in as **{st.session_state.user_info['username']}**")
     
     # Button to go to dashboard
@@ -64,12 +67,19 @@ with tab_login:
                 st.error("Please fill in both username and password")
             else:
                 # Try to authenticate the user
-                success, user_info = authenticate_user(username, password)
+                try:
+                    success, user_info = authenticate_user(username, password,
+                                                           client=st.context.ip_address)
+                except AuthExecutorBusy:
+                    st.error("The server is busy, please try again in a moment")
+                    st.stop()
+                except LoginThrottled as e:
+                    st.error(f"Too many login attempts, please wait {e.retry_after:.0f} seconds")
+                    st.stop()
                 
                 if success:
-                    # If login successful, update session state
-                    st.session_state.logged_in = True
-                    st.session_state.user_info = user_info
+                    # If login successful, start a server-side session
+                    start_session(user_info)
                     st.success(f"Welcome back, {username}!")
                     
                     # Show success message, then redirect
@@ -118,7 +128,8 @@ with tab_register:
                     
                     else:
                         # Try to register the user
-                        success, message = register_user(new_username, new_password)
+                        success, message = register_user(new_username, new_password,
+                                                         client=st.context.ip_address)
                         
                         if success:
                             st.success(message)
@@ -2,18 +2,32 @@
 From week 7 - Polished 
 """
 
+import os
+import time
+
 import bcrypt
-from app.data.users import get_user_by_username, insert_user
+from app.data.users import get_user_by_username, insert_user, update_password_hash
+from app.auth_executor import submit_hash, submit_check, wait_result, AuthExecutorBusy
+from app.throttle import check_login_allowed, LoginThrottled
+from app.blocklist import is_compromised_password
+
+# bcrypt cost (log2 of the number of rounds). Pick it for this host with
+#   python -m app.auth --target-ms 250
+# and set BCRYPT_ROUNDS. Stored hashes with a different cost are rehashed
+# the next time their owner logs in.
+BCRYPT_SETTINGS = {
+    "rounds": int(os.environ.get("BCRYPT_ROUNDS", 12)),
+}
 
-def hash_password(password):
+def hash_password(password, rounds=None):
 
     """Hash a password using bcrypt for secure storage"""
     
     # Convert the password to bytes
     password_bytes = password.encode('utf-8')
     
-    # Generate a salt
-    salt = bcrypt.gensalt()
+    # Generate a salt with the configured cost
+    salt = bcrypt.gensalt(rounds or BCRYPT_SETTINGS["rounds"])
     
     # Hash the password using the salt
     hashed_password = bcrypt.hashpw(password_bytes, salt)
@@ -36,17 +50,71 @@ def verify_password(password, hashed_password):
         # If anything goes wrong return False
         return False
 
-def register_user(username, password, role='user'):
+def _hash_rounds(hashed_password):
+
+    """Return the cost stored in a bcrypt hash ("$2b$12$..." -> 12), or None"""
+    
+    parts = hashed_password.split('$')
+    if len(parts) < 4 or not parts[2].isdigit():
+        return None
+    return int(parts[2])
+
+def needs_rehash(hashed_password):
+
+    """Check if a stored hash was made with a different cost than the current policy.
+    Hashes whose cost can't be read are never rehashed."""
+    
+    rounds = _hash_rounds(hashed_password)
+    return rounds is not None and rounds != BCRYPT_SETTINGS["rounds"]
+
+def calibrate_rounds(target_ms=250, min_rounds=10, max_rounds=16):
+
+    """
+    Time bcrypt on this host and pick the cost for a target latency.
+    
+    Each extra round doubles the work, so the cost is the highest one
+    whose hash time stays at or under target_ms. min_rounds is a floor:
+    nothing cheaper is ever recommended.
+    
+    Returns:
+        tuple: (rounds, {rounds: milliseconds measured}); rounds is None
+               if even min_rounds takes longer than target_ms
+    """
+    
+    timings = {}
+    chosen = None
+    for rounds in range(min_rounds, max_rounds + 1):
+        start = time.perf_counter()
+        bcrypt.hashpw(b'calibration-password', bcrypt.gensalt(rounds))
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        timings[rounds] = elapsed_ms
+        
+        if elapsed_ms > target_ms:
+            break
+        chosen = rounds
+    
+    return chosen, timings
+
+def register_user(username, password, role='user', client=None):
 
     """Register a new user to the system"""
     
+    # Registration hashes a password too, so it shares the login throttle
+    try:
+        check_login_allowed(username, client)
+    except LoginThrottled as e:
+        return False, str(e)
+    
     # Check if user already exists
     existing_user = get_user_by_username(username)
     if existing_user:
         return False, "Username already exists"
     
-    # Hash the password
-    password_hash = hash_password(password)
+    # Hash the password in the auth executor (off the script thread)
+    try:
+        password_hash = wait_result(submit_hash(password, BCRYPT_SETTINGS["rounds"]))
+    except AuthExecutorBusy as e:
+        return False, str(e)
     
     # Insert user into database
     try:
@@ -55,9 +123,21 @@ def register_user(username, password, role='user'):
     except Exception as e:
         return False, f"Error registering user: {str(e)}"
 
-def authenticate_user(username, password):
+def authenticate_user(username, password, client=None):
 
-    """Authenticate a user by checking username and password"""
+    """
+    Authenticate a user by checking username and password.
+    
+    Attempts are throttled per username and per client (e.g. IP address)
+    before any hashing; raises LoginThrottled when over the limit. The
+    bcrypt check runs in the auth executor; raises AuthExecutorBusy if too
+    many logins are already queued, the check times out or its worker
+    process died. A hash stored with a different cost
+    than BCRYPT_SETTINGS is replaced after a successful login.
+    """
+    
+    # Reject over-limit attempts before doing any bcrypt work
+    check_login_allowed(username, client)
     
     # Get user from database
     user = get_user_by_username(username)
@@ -69,8 +149,17 @@ def authenticate_user(username, password):
     # Creating a user tuple with format: (id, username, password_hash, role)
     user_id, db_username, stored_hash, user_role = user
     
-    # Verify the password
-    if verify_password(password, stored_hash):
+    # Verify the password in the auth executor (off the script thread)
+    if wait_result(submit_check(password, stored_hash)):
+        # Bring the stored hash up to the current cost while we have the password
+        if needs_rehash(stored_hash):
+            try:
+                new_hash = wait_result(submit_hash(password, BCRYPT_SETTINGS["rounds"]))
+                update_password_hash(user_id, new_hash)
+            except Exception:
+                # The login still succeeds; we'll try again next time
+                pass
+        
         # Return user information if authentication successful
         user_info = {
             'id': user_id,
@@ -119,4 +208,29 @@ def validate_password(password):
     if not has_lower:
         return False, "Password must contain at least one lowercase letter"
     
-    return True, ""
\ No newline at end of file
+    # Known leaked passwords (Bloom filter on disk, built with python -m app.blocklist)
+    if is_compromised_password(password):
+        return False, "This password has appeared in a data breach, please choose another"
+    
+    return True, ""
+
+if __name__ == "__main__":
+    # Calibration: python -m app.auth --target-ms 250
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Pick a bcrypt cost for this host")
+    parser.add_argument("--target-ms", type=float, default=250,
+                        help="Target time for one hash in milliseconds")
+    args = parser.parse_args()
+    
+    rounds, timings = calibrate_rounds(args.target_ms)
+    for r, ms in timings.items():
+        print(f"   rounds={r}: {ms:.1f} ms")
+    if rounds is None:
+        floor, floor_ms = next(iter(timings.items()))
+        print(f"❌ Can't meet {args.target_ms:.0f} ms on this host: even the minimum "
+              f"cost ({floor}) takes {floor_ms:.0f} ms.")
+        print("   Raise --target-ms or run on a faster host; the cost can't go below the minimum.")
+        raise SystemExit(1)
+    print(f"✅ Recommended cost for {args.target_ms:.0f} ms: {rounds}")
+    print(f"   export BCRYPT_ROUNDS={rounds}")
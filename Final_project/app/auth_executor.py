@@ -0,0 +1,198 @@
+"""
+Runs bcrypt hashing and checking in a process pool so logins don't queue
+behind each other on the Streamlit script threads.
+
+submit_hash() / submit_check() return a Future right away; call
+wait_result() (or future.result()) to get the answer. The number of
+hashes waiting or running is capped, and queue depth and latency
+percentiles are available from get_executor_stats().
+
+Worker processes are started with "spawn": forking the multi-threaded
+Streamlit server can deadlock the child. If a worker dies the pool is
+replaced on the next request instead of failing every login after it.
+"""
+
+import multiprocessing
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+
+import bcrypt
+
+EXECUTOR_SETTINGS = {
+    # Processes doing bcrypt work at the same time
+    "max_workers": os.cpu_count() or 2,
+    # Hashes allowed to be waiting or running before submit() gives up
+    "max_pending": 64,
+    # Seconds submit() waits for a free slot
+    "submit_timeout": 5,
+    # How many recent latencies are kept for the percentiles
+    "latency_window": 1000,
+}
+
+
+class AuthExecutorBusy(RuntimeError):
+    """Raised when too many hashes are already queued, or one couldn't finish."""
+
+
+_executor_lock = threading.Lock()
+_executor = {"pool": None, "slots": None}
+_stats_lock = threading.Lock()
+_stats = {"submitted": 0, "completed": 0, "rejected": 0, "in_flight": 0}
+_latencies = deque(maxlen=EXECUTOR_SETTINGS["latency_window"])
+
+
+def _hash_worker(password_bytes, rounds):
+    """Runs in a worker process: hash a password."""
+    salt = bcrypt.gensalt(rounds) if rounds else bcrypt.gensalt()
+    return bcrypt.hashpw(password_bytes, salt).decode("utf-8")
+
+
+def _check_worker(password_bytes, hashed_bytes):
+    """Runs in a worker process: check a password against a hash."""
+    try:
+        return bcrypt.checkpw(password_bytes, hashed_bytes)
+    except ValueError:
+        # Malformed hash
+        return False
+
+
+def _get_pool():
+    """Create the process pool on first use."""
+    with _executor_lock:
+        if _executor["pool"] is None:
+            _executor["pool"] = ProcessPoolExecutor(
+                max_workers=EXECUTOR_SETTINGS["max_workers"],
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+            _executor["slots"] = threading.BoundedSemaphore(EXECUTOR_SETTINGS["max_pending"])
+        return _executor["pool"], _executor["slots"]
+
+
+def _discard_pool(pool):
+    """Drop a broken pool so the next request starts a new one."""
+    with _executor_lock:
+        if _executor["pool"] is pool:
+            _executor["pool"] = None
+            _executor["slots"] = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _submit(func, *args):
+    """Submit work to the pool, respecting the pending cap, and track its latency."""
+    # A pool found broken is replaced once; if the fresh one breaks too, give up
+    for attempt in range(2):
+        pool, slots = _get_pool()
+
+        if not slots.acquire(timeout=EXECUTOR_SETTINGS["submit_timeout"]):
+            with _stats_lock:
+                _stats["rejected"] += 1
+            raise AuthExecutorBusy("Too many login requests in progress, please try again")
+
+        try:
+            future = pool.submit(func, *args)
+            break
+        except BrokenProcessPool:
+            slots.release()
+            _discard_pool(pool)
+        except Exception:
+            slots.release()
+            raise
+    else:
+        with _stats_lock:
+            _stats["rejected"] += 1
+        raise AuthExecutorBusy("The login server couldn't start a worker, please try again")
+
+    start = time.perf_counter()
+    with _stats_lock:
+        _stats["submitted"] += 1
+        _stats["in_flight"] += 1
+
+    def on_done(_future):
+        slots.release()
+        with _stats_lock:
+            _stats["completed"] += 1
+            _stats["in_flight"] -= 1
+            _latencies.append(time.perf_counter() - start)
+
+    future.auth_pool = pool
+    future.add_done_callback(on_done)
+    return future
+
+
+def submit_hash(password, rounds=None):
+    """
+    Queue a bcrypt hash of password.
+
+    Returns:
+        concurrent.futures.Future: resolves to the hash as a string
+    """
+    return _submit(_hash_worker, password.encode("utf-8"), rounds)
+
+
+def submit_check(password, hashed_password):
+    """
+    Queue a bcrypt check of password against hashed_password.
+
+    Returns:
+        concurrent.futures.Future: resolves to True / False
+    """
+    return _submit(_check_worker, password.encode("utf-8"), hashed_password.encode("utf-8"))
+
+
+def wait_result(future, timeout=30):
+    """
+    Wait for a submitted hash or check and return its result.
+
+    Raises:
+        AuthExecutorBusy: If it took longer than timeout seconds, or the
+                          worker process died (the pool is replaced)
+    """
+    try:
+        return future.result(timeout=timeout)
+    except FutureTimeoutError:
+        future.cancel()
+        raise AuthExecutorBusy("The login server is overloaded, please try again") from None
+    except BrokenProcessPool:
+        _discard_pool(future.auth_pool)
+        raise AuthExecutorBusy("The login server restarted a worker, please try again") from None
+
+
+def _percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return None
+    index = max(0, int(round(pct / 100 * len(sorted_values))) - 1)
+    return sorted_values[index]
+
+
+def get_executor_stats():
+    """
+    Return executor statistics.
+
+    Returns:
+        dict: submitted, completed, rejected, queue_depth (waiting or
+              running), max_workers and p50/p95/p99 latency in milliseconds
+    """
+    with _stats_lock:
+        stats = dict(_stats)
+        latencies = sorted(_latencies)
+
+    stats["queue_depth"] = stats.pop("in_flight")
+    stats["max_workers"] = EXECUTOR_SETTINGS["max_workers"]
+    for pct in (50, 95, 99):
+        value = _percentile(latencies, pct)
+        stats[f"p{pct}_ms"] = round(value * 1000, 1) if value is not None else None
+    return stats
+
+
+def shutdown_executor():
+    """Stop the worker processes (they are started again on next use)."""
+    with _executor_lock:
+        if _executor["pool"] is not None:
+            _executor["pool"].shutdown(wait=True)
+            _executor["pool"] = None
+            _executor["slots"] = None
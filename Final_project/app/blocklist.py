@@ -0,0 +1,215 @@
+"""
+Compromised-password blocklist stored as a Bloom filter on disk.
+
+The filter is built once from a wordlist of leaked passwords (one per line)
+and memory-mapped when checked, so only the pages actually touched are
+read and the whole list never has to be loaded into memory. A Bloom filter
+never misses a listed password; it may wrongly flag an unlisted one with
+the false-positive rate chosen at build time.
+
+Build:
+    python -m app.blocklist leaked-passwords.txt --fp-rate 0.001
+
+File layout: 8-byte magic, then m (number of bits, uint64), k (number of
+hashes, uint32) and n (number of passwords, uint64), little-endian,
+followed by the m-bit array.
+"""
+
+import hashlib
+import math
+import mmap
+import os
+import struct
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+
+from app.data.db import DB_PATH
+
+BLOCKLIST_SETTINGS = {
+    "path": Path(os.environ.get("PASSWORD_BLOCKLIST", DB_PATH.parent / "password_blocklist.bloom")),
+    "fp_rate": 0.001,
+    # How often (seconds) to look for a rebuilt filter file
+    "recheck_seconds": 5,
+}
+
+_MAGIC = b"BLOOMPW1"
+_HEADER = struct.Struct("<8sQIQ")
+_MASK64 = (1 << 64) - 1
+
+_filter_lock = threading.Lock()
+# "current" is the loaded filter: {"path", "mmap", "m", "k", "n"}. A rebuilt
+# file gets a new dict rather than updating this one, so a check already
+# running keeps a consistent filter; the old mmap is closed by the garbage
+# collector once the last check using it has finished.
+_filter = {"current": None, "checked_at": None}
+
+
+def _hash_pair(password_bytes):
+    """Two 64-bit hashes of a password; bit i is (h1 + i * h2) mod m."""
+    digest = hashlib.blake2b(password_bytes, digest_size=16).digest()
+    return int.from_bytes(digest[:8], "little"), int.from_bytes(digest[8:], "little") | 1
+
+
+def filter_size(n, fp_rate):
+    """
+    Bits and hash count for n passwords at a target false-positive rate.
+
+    Returns:
+        tuple: (m bits, k hashes)
+    """
+    n = max(n, 1)
+    m = math.ceil(-n * math.log(fp_rate) / (math.log(2) ** 2))
+    k = max(1, round(m / n * math.log(2)))
+    return m, k
+
+
+def _iter_wordlist(wordlist_path):
+    """Yield each non-empty line of the wordlist as bytes."""
+    with open(wordlist_path, "rb") as f:
+        for line in f:
+            word = line.rstrip(b"\r\n")
+            if word:
+                yield word
+
+
+def build_blocklist(wordlist_path, out_path=None, fp_rate=None, chunk_size=100000):
+    """
+    Build the Bloom filter file from a wordlist.
+
+    Args:
+        wordlist_path: Text file with one leaked password per line
+        out_path: Where to write the filter (default: BLOCKLIST_SETTINGS["path"])
+        fp_rate: Target false-positive rate (default: BLOCKLIST_SETTINGS["fp_rate"])
+        chunk_size: Passwords hashed per numpy batch
+
+    Returns:
+        dict: n, m, k and size_mb of the filter written
+    """
+    out_path = Path(out_path or BLOCKLIST_SETTINGS["path"])
+    fp_rate = fp_rate or BLOCKLIST_SETTINGS["fp_rate"]
+
+    # First pass just counts, so the filter can be sized
+    n = sum(1 for _ in _iter_wordlist(wordlist_path))
+    m, k = filter_size(n, fp_rate)
+    bits = np.zeros((m + 7) // 8, dtype=np.uint8)
+    steps = np.arange(k, dtype=np.uint64)
+
+    def add_batch(pairs):
+        h = np.array(pairs, dtype=np.uint64)
+        # uint64 arithmetic wraps, matching the & _MASK64 in is_compromised_password
+        positions = (h[:, :1] + steps * h[:, 1:]) % np.uint64(m)
+        positions = positions.ravel()
+        np.bitwise_or.at(bits, positions >> np.uint64(3),
+                         np.left_shift(1, positions & np.uint64(7)).astype(np.uint8))
+
+    pairs = []
+    for word in _iter_wordlist(wordlist_path):
+        pairs.append(_hash_pair(word))
+        if len(pairs) >= chunk_size:
+            add_batch(pairs)
+            pairs = []
+    if pairs:
+        add_batch(pairs)
+
+    # Write to a temporary file and swap it in, so readers never see half a filter
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    temp_path = out_path.with_suffix(out_path.suffix + ".tmp")
+    with open(temp_path, "wb") as f:
+        f.write(_HEADER.pack(_MAGIC, m, k, n))
+        f.write(bits.tobytes())
+    os.replace(temp_path, out_path)
+
+    return {"n": n, "m": m, "k": k, "size_mb": round(out_path.stat().st_size / (1024 * 1024), 2)}
+
+
+def _load_filter():
+    """Memory-map the filter file, re-opening it if it was rebuilt. Returns None if there isn't one."""
+    now = time.monotonic()
+    checked_at = _filter["checked_at"]
+    if checked_at is not None and now - checked_at < BLOCKLIST_SETTINGS["recheck_seconds"]:
+        return _filter["current"]
+
+    path = BLOCKLIST_SETTINGS["path"]
+    _filter["checked_at"] = now
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+
+    key = (str(path), stat.st_ino, stat.st_mtime_ns)
+    with _filter_lock:
+        current = _filter["current"]
+        if current is None or current["path"] != key:
+            with open(path, "rb") as f:
+                mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            magic, m, k, n = _HEADER.unpack_from(mapped)
+            if magic != _MAGIC:
+                mapped.close()
+                raise ValueError(f"{path} is not a password blocklist")
+            # Don't close the old mmap: other threads may still be reading it
+            current = {"path": key, "mmap": mapped, "m": m, "k": k, "n": n}
+            _filter["current"] = current
+        return current
+
+
+def is_compromised_password(password):
+    """
+    Check a password against the blocklist.
+
+    Returns:
+        bool: True if the password is (probably) in the leaked list;
+              False if it isn't, or no blocklist has been built
+    """
+    bloom = _load_filter()
+    if bloom is None:
+        return False
+
+    h1, h2 = _hash_pair(password.encode("utf-8"))
+    mapped, m = bloom["mmap"], bloom["m"]
+    offset = _HEADER.size
+    # Stops at the first unset bit, so most clean passwords need one or two reads
+    for i in range(bloom["k"]):
+        position = ((h1 + i * h2) & _MASK64) % m
+        if not mapped[offset + (position >> 3)] & (1 << (position & 7)):
+            return False
+    return True
+
+
+def get_blocklist_info():
+    """
+    Describe the loaded blocklist.
+
+    Returns:
+        dict: path, passwords (n), bits (m), hashes (k) and the expected
+              false-positive rate; None if no blocklist has been built
+    """
+    bloom = _load_filter()
+    if bloom is None:
+        return None
+    m, k, n = bloom["m"], bloom["k"], bloom["n"]
+    return {
+        "path": str(BLOCKLIST_SETTINGS["path"]),
+        "passwords": n,
+        "bits": m,
+        "hashes": k,
+        "fp_rate": (1 - math.exp(-k * n / m)) ** k if m else 0.0,
+    }
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Build the compromised-password Bloom filter")
+    parser.add_argument("wordlist", help="Text file with one leaked password per line")
+    parser.add_argument("--fp-rate", type=float, default=BLOCKLIST_SETTINGS["fp_rate"],
+                        help="Target false-positive rate")
+    parser.add_argument("--out", default=None, help="Output file (default: DATA/password_blocklist.bloom)")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    info = build_blocklist(args.wordlist, args.out, args.fp_rate)
+    print(f"✅ Built blocklist of {info['n']:,} passwords ({info['size_mb']} MB, "
+          f"{info['k']} hashes) in {time.perf_counter() - start:.1f}s")
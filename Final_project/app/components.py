@@ -0,0 +1,136 @@
+"""
+Reusable Streamlit components for the dashboard pages.
+"""
+
+import streamlit as st
+
+from app.sessions import (create_session, validate_session, revoke_session, revoke_user_sessions,
+                          issue_reconnect_nonce, redeem_reconnect_nonce)
+
+# Query parameter carrying a one-time reconnect nonce (never the session
+# token), so a page reload picks the session back up without logging in
+RESUME_PARAM = "resume"
+
+
+def _client_ip():
+    return getattr(st.context, "ip_address", None)
+
+
+def _refresh_resume_link(token):
+    """Put a fresh nonce in the URL; the previous one stops working."""
+    st.query_params[RESUME_PARAM] = issue_reconnect_nonce(token, client=_client_ip())
+
+
+def start_session(user_info):
+    """Log a user in for this browser session after a successful login."""
+    token = create_session(user_info)
+    st.session_state.session_token = token
+    st.session_state.logged_in = True
+    st.session_state.user_info = user_info
+    _refresh_resume_link(token)
+
+
+def restore_session():
+    """
+    Page guard: check the session token kept in session state, or after a
+    reload redeem the reconnect nonce from the URL for it.
+
+    Validation is a signature check and dict lookups, never bcrypt.
+
+    Returns:
+        bool: True if the user is logged in
+    """
+    token = st.session_state.get("session_token")
+    if not token:
+        token = redeem_reconnect_nonce(st.query_params.get(RESUME_PARAM), client=_client_ip())
+    user_info = validate_session(token)
+
+    if user_info is None:
+        st.session_state.session_token = None
+        st.session_state.logged_in = False
+        st.session_state.user_info = None
+        st.query_params.pop(RESUME_PARAM, None)
+        return False
+
+    st.session_state.session_token = token
+    st.session_state.logged_in = True
+    st.session_state.user_info = user_info
+    # Rotate on every use, so a copied or old link is dead soon after
+    _refresh_resume_link(token)
+    return True
+
+
+def end_session(all_sessions=False):
+    """
+    Log out this browser session, or every session of the user.
+
+    Args:
+        all_sessions: Also revoke the user's sessions on other browsers
+    """
+    user_info = st.session_state.get("user_info")
+    if all_sessions and user_info:
+        revoke_user_sessions(user_info["id"])
+    else:
+        revoke_session(st.session_state.get("session_token"))
+
+    st.session_state.session_token = None
+    st.session_state.logged_in = False
+    st.session_state.user_info = None
+    st.query_params.pop(RESUME_PARAM, None)
+
+
+def paginated_table(key, fetch_page, page_size=50, reset_on=None):
+    """
+    Show a table one page at a time with Previous / Next buttons.
+
+    Only the rows of the current page are fetched and sent to the browser.
+
+    Args:
+        key: Unique key for this table (used for session state and widgets)
+        fetch_page: Function fetch_page(after_id, page_size) returning
+                    (DataFrame, after_id of the next page or None), optionally
+                    followed by the total number of matching rows
+        page_size: Number of rows per page
+        reset_on: Any value (e.g. the current filters); when it changes the
+                  table goes back to the first page
+
+    Returns:
+        tuple: (DataFrame of the rows shown, total rows or None if fetch_page
+                doesn't report it)
+    """
+    cursors_key = f"{key}_cursors"
+    reset_key = f"{key}_reset_on"
+
+    # Stack of after_ids, one per page visited; the last one is the current page
+    if cursors_key not in st.session_state or st.session_state.get(reset_key) != reset_on:
+        st.session_state[cursors_key] = [None]
+        st.session_state[reset_key] = reset_on
+
+    cursors = st.session_state[cursors_key]
+    result = fetch_page(cursors[-1], page_size)
+    page_df, next_after_id = result[0], result[1]
+    total = result[2] if len(result) > 2 else None
+
+    # Callbacks run before the next rerun, so the new page renders straight away
+    def go_next():
+        st.session_state[cursors_key].append(next_after_id)
+
+    def go_previous():
+        st.session_state[cursors_key].pop()
+
+    if len(page_df) > 0:
+        st.dataframe(page_df, use_container_width=True)
+    else:
+        st.info("No rows to show")
+
+    col1, col2, col3 = st.columns([1, 2, 1])
+    with col1:
+        st.button("⬅️ Previous", key=f"{key}_prev", on_click=go_previous,
+                  disabled=len(cursors) <= 1)
+    with col2:
+        st.write(f"Page {len(cursors)}")
+    with col3:
+        st.button("Next ➡️", key=f"{key}_next", on_click=go_next,
+                  disabled=next_after_id is None)
+
+    return page_df, total
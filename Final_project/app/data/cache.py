@@ -0,0 +1,168 @@
+"""
+Shared query result cache.
+
+Read functions decorated with @cached_query keep their results in memory,
+shared by every Streamlit session in the process. Each result remembers the
+version of the tables it read; insert, update and delete functions call
+bump_table_version(), which makes older results for that table stale.
+Writes made elsewhere (another Streamlit server, a loader script) are
+picked up from the changelog table before every cached read.
+The cache is a size-bounded LRU.
+"""
+
+import copy
+import functools
+import inspect
+import sys
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+CACHE_SETTINGS = {
+    "max_entries": 512,
+    "max_bytes": 64 * 1024 * 1024,
+}
+
+_cache_lock = threading.Lock()
+_cache = OrderedDict()          # key -> (table versions, result, size in bytes)
+_cache_bytes = 0
+_table_versions = {}
+_cache_stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+
+def bump_table_version(*tables):
+    """Mark cached results that read any of these tables as stale."""
+    with _cache_lock:
+        for table in tables:
+            _table_versions[table] = _table_versions.get(table, 0) + 1
+
+
+def get_table_version(table):
+    """Return the current write version of a table."""
+    with _cache_lock:
+        return _table_versions.get(table, 0)
+
+
+def _freeze(value):
+    """Turn dicts/lists/sets into tuples so they can be part of a cache key."""
+    if isinstance(value, dict):
+        return tuple(sorted((k, _freeze(v)) for k, v in value.items()))
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(v) for v in value)
+    if isinstance(value, set):
+        return tuple(sorted(_freeze(v) for v in value))
+    return value
+
+
+def _result_size(result):
+    """Rough size of a cached result in bytes."""
+    if isinstance(result, pd.DataFrame):
+        return int(result.memory_usage(index=True, deep=True).sum())
+    if isinstance(result, (dict, list, tuple)):
+        values = result.values() if isinstance(result, dict) else result
+        return sys.getsizeof(result) + sum(_result_size(v) for v in values)
+    return sys.getsizeof(result)
+
+
+def _copy_result(result):
+    """Copy a result so callers can't change the cached one."""
+    if isinstance(result, pd.DataFrame):
+        return result.copy()
+    if isinstance(result, dict):
+        return {k: _copy_result(v) for k, v in result.items()}
+    if isinstance(result, tuple):
+        return tuple(_copy_result(v) for v in result)
+    return copy.copy(result)
+
+
+def _database_of(conn):
+    """Return the file behind a connection so different databases don't share entries."""
+    return conn.execute("PRAGMA database_list").fetchone()[2]
+
+
+def cached_query(*tables, table_param=None):
+    """
+    Decorator for read functions whose first argument is a connection.
+
+    Args:
+        tables: Tables the function reads
+        table_param: Name of a parameter holding the table name, for generic
+                     helpers such as get_distinct_values(conn, table_name, column)
+    """
+    def decorator(func):
+        signature = inspect.signature(func)
+
+        @functools.wraps(func)
+        def wrapper(conn, *args, **kwargs):
+            global _cache_bytes
+
+            read_tables = tables
+            if table_param:
+                bound = signature.bind(conn, *args, **kwargs)
+                read_tables = tables + (bound.arguments[table_param],)
+
+            key = (func.__module__, func.__qualname__, _database_of(conn),
+                   _freeze(args), _freeze(kwargs))
+
+            # Bump the versions of tables other processes have written to.
+            # Imported here: app.data.changelog imports this module
+            from app.data.changelog import refresh_cache_from_changelog
+            refresh_cache_from_changelog(conn)
+
+            with _cache_lock:
+                versions = tuple(_table_versions.get(t, 0) for t in read_tables)
+                entry = _cache.get(key)
+                if entry is not None and entry[0] == versions:
+                    _cache.move_to_end(key)
+                    _cache_stats["hits"] += 1
+                    return _copy_result(entry[1])
+                _cache_stats["misses"] += 1
+
+            result = func(conn, *args, **kwargs)
+            size = _result_size(result)
+
+            with _cache_lock:
+                # A write may have happened while we were querying
+                if versions != tuple(_table_versions.get(t, 0) for t in read_tables):
+                    return result
+
+                old = _cache.pop(key, None)
+                if old is not None:
+                    _cache_bytes -= old[2]
+                _cache[key] = (versions, result, size)
+                _cache_bytes += size
+
+                # Evict least recently used entries until we're under both limits
+                while _cache and (len(_cache) > CACHE_SETTINGS["max_entries"]
+                                  or _cache_bytes > CACHE_SETTINGS["max_bytes"]):
+                    _, (_, _, evicted_size) = _cache.popitem(last=False)
+                    _cache_bytes -= evicted_size
+                    _cache_stats["evictions"] += 1
+
+            return _copy_result(result)
+
+        return wrapper
+    return decorator
+
+
+def get_cache_stats():
+    """
+    Return cache statistics.
+
+    Returns:
+        dict: hits, misses, evictions, entries and bytes
+    """
+    with _cache_lock:
+        stats = dict(_cache_stats)
+        stats["entries"] = len(_cache)
+        stats["bytes"] = _cache_bytes
+    return stats
+
+
+def clear_cache():
+    """Drop every cached result."""
+    global _cache_bytes
+    with _cache_lock:
+        _cache.clear()
+        _cache_bytes = 0
@@ -0,0 +1,144 @@
+"""
+Change-data-capture API over the changelog table.
+
+Triggers (schema migration 2) append (seq, table_name, row_id, op,
+changed_at) for every insert, update and delete on the domain tables and
+users. Readers remember the last seq they saw and ask for what came after.
+"""
+
+import sqlite3
+import threading
+import time
+
+from app.data.cache import bump_table_version
+
+# Highest changelog seq already turned into cache invalidations
+_seen_lock = threading.Lock()
+_last_seen_seq = {"seq": None}
+
+
+def latest_seq(conn):
+    """Return the newest changelog seq (0 if the log is empty)."""
+    cur = conn.cursor()
+    cur.execute("SELECT COALESCE(MAX(seq), 0) FROM changelog")
+    return cur.fetchone()[0]
+
+
+def changes_since(conn, seq=0, tables=None, batch_size=1000):
+    """
+    Stream changelog entries newer than seq, oldest first.
+
+    Args:
+        conn: Database connection
+        seq: Last seq the caller has already processed
+        tables: Optional list of table names to include
+        batch_size: Rows fetched from SQLite at a time
+
+    Yields:
+        tuple: (seq, table_name, row_id, op, changed_at)
+    """
+    query = "SELECT seq, table_name, row_id, op, changed_at FROM changelog WHERE seq > ?"
+    params = [seq]
+    if tables:
+        query += f" AND table_name IN ({', '.join('?' for _ in tables)})"
+        params.extend(tables)
+    query += " ORDER BY seq"
+
+    cur = conn.cursor()
+    cur.execute(query, params)
+    while True:
+        rows = cur.fetchmany(batch_size)
+        if not rows:
+            break
+        yield from rows
+
+
+def compact_changelog(conn, max_age_seconds=7 * 24 * 3600, max_rows=1000000):
+    """
+    Keep the changelog bounded.
+
+    - Entries older than max_age_seconds are deleted.
+    - For each (table, row) only the newest entry is kept, since readers
+      only need to know that the row changed and what its last op was.
+    - If more than max_rows remain, the oldest are deleted.
+
+    Returns:
+        int: Number of entries deleted
+    """
+    cur = conn.cursor()
+    deleted = 0
+
+    cutoff = int(time.time()) - max_age_seconds
+    cur.execute("DELETE FROM changelog WHERE changed_at < ?", (cutoff,))
+    deleted += cur.rowcount
+
+    cur.execute(
+        """
+        DELETE FROM changelog
+        WHERE seq NOT IN (
+            SELECT MAX(seq) FROM changelog GROUP BY table_name, row_id
+        )
+        """
+    )
+    deleted += cur.rowcount
+
+    cur.execute(
+        """
+        DELETE FROM changelog
+        WHERE seq <= (SELECT MAX(seq) FROM changelog) - ?
+        """,
+        (max_rows,)
+    )
+    deleted += cur.rowcount
+
+    conn.commit()
+    return deleted
+
+
+def refresh_cache_from_changelog(conn):
+    """
+    Invalidate cached results for tables changed since the last call,
+    including changes made by other processes (e.g. the CSV loaders).
+
+    Called by every @cached_query read; with nothing new it is one seek on
+    the changelog's primary key. The first call only records the current
+    position.
+    """
+    with _seen_lock:
+        last_seq = _last_seen_seq["seq"]
+
+    if last_seq is None:
+        try:
+            seq = latest_seq(conn)
+        except sqlite3.OperationalError:
+            return
+        with _seen_lock:
+            _last_seen_seq["seq"] = seq
+        return
+
+    try:
+        cur = conn.cursor()
+        cur.execute(
+            "SELECT table_name, MAX(seq) FROM changelog WHERE seq > ? GROUP BY table_name",
+            (last_seq,)
+        )
+        changed = cur.fetchall()
+    except sqlite3.OperationalError:
+        # Database hasn't been migrated to the changelog schema yet
+        return
+    if not changed:
+        return
+
+    bump_table_version(*(table for table, _ in changed))
+    with _seen_lock:
+        _last_seen_seq["seq"] = max(_last_seen_seq["seq"], max(seq for _, seq in changed))
+
+
+if __name__ == "__main__":
+    # Retention job, e.g. run nightly: python -m app.data.changelog
+    from app.data.db import connect_database
+
+    conn = connect_database()
+    removed = compact_changelog(conn)
+    print(f"✅ Removed {removed} changelog entries, newest seq is {latest_seq(conn)}")
+    conn.close()
@@ -6,6 +6,9 @@ import pandas as pd
 from pathlib import Path
 from app.data.db import connect_database
 from app.data.incidents import load_csv_to_table
+from app.data.pagination import fetch_page, DEFAULT_PAGE_SIZE
+from app.data.filters import filter_rows
+from app.data.cache import cached_query, bump_table_version
 
 
 def load_datasets_csv(conn, csv_path):
@@ -25,14 +28,28 @@ def insert_dataset(conn, dataset_name, category, source, last_updated, record_co
         (dataset_name, category, source, last_updated, record_count, file_size_mb)
     )
     conn.commit()
+    bump_table_version("datasets_metadata")
     return cur.lastrowid
 
 
+@cached_query("datasets_metadata")
 def get_all_datasets(conn):
     """Return a DataFrame of all datasets."""
     return pd.read_sql_query("SELECT * FROM datasets_metadata ORDER BY id DESC", conn)
 
 
+@cached_query("datasets_metadata")
+def get_datasets_page(conn, after_id=None, page_size=DEFAULT_PAGE_SIZE, filters=None):
+    """Return (page of datasets newest first, after_id for the next page or None)."""
+    return fetch_page(conn, "datasets_metadata", after_id, page_size, filters)
+
+
+@cached_query("datasets_metadata")
+def filter_datasets(conn, spec, after_id=None, page_size=DEFAULT_PAGE_SIZE):
+    """Return (page of datasets matching spec, next after_id or None, total matches)."""
+    return filter_rows(conn, "datasets_metadata", spec, after_id, page_size)
+
+
 def update_dataset_record_count(conn, dataset_id, new_count):
     """Update record_count for a dataset."""
     cur = conn.cursor()
@@ -41,6 +58,7 @@ def update_dataset_record_count(conn, dataset_id, new_count):
         (new_count, dataset_id)
     )
     conn.commit()
+    bump_table_version("datasets_metadata")
     return cur.rowcount
 
 
@@ -52,4 +70,5 @@ def delete_dataset(conn, dataset_id):
         (dataset_id,)
     )
     conn.commit()
+    bump_table_version("datasets_metadata")
     return cur.rowcount
@@ -3,10 +3,43 @@ From Week 8
 """
 
 import sqlite3
+import threading
+from contextlib import contextmanager
 from pathlib import Path
+from app.data.migrations import migrate
 
 DB_PATH = Path("Final_project\DATA") / "intelligence_platform.db"
 
+# Settings applied to every pooled connection.
+# cache_size is negative so SQLite reads it as KiB (-20000 = ~20 MB page cache)
+POOL_SETTINGS = {
+    "max_connections": 16,
+    "cache_size": -20000,
+    "mmap_size": 256 * 1024 * 1024,
+    "busy_timeout": 5000,
+    "synchronous": "NORMAL",
+    "wait_timeout": 30,
+}
+
+# Shared pool state, protected by _pool_lock
+_pool_lock = threading.Lock()
+_pool_available = threading.Condition(_pool_lock)
+_idle_connections = {}
+_open_connections = {}
+_checked_out = {}
+# Connections being opened outside the lock; they count towards max_connections
+_opening = {}
+_pool_stats = {"hits": 0, "misses": 0, "waits": 0}
+
+# Databases already brought up to the current schema by this process.
+# Migrating has its own lock so it never blocks threads reusing idle connections
+_migrate_lock = threading.Lock()
+_migrated_paths = set()
+
+# Connection currently checked out by each thread
+_thread_local = threading.local()
+
+
 def connect_database(db_path=DB_PATH):
     """
     Connect to the SQLite database and return a connection object.
@@ -17,3 +50,196 @@ def connect_database(db_path=DB_PATH):
     conn = sqlite3.connect(str(db_path))
     conn.execute("PRAGMA foreign_keys = ON;")
     return conn
+
+
+def configure_pool(**settings):
+    """
+    Change the pool settings (max_connections, cache_size, mmap_size,
+    busy_timeout, synchronous, wait_timeout).
+
+    Connections that are already open keep their old settings, so call this
+    before the first get_connection() or after close_pool().
+    """
+    for key in settings:
+        if key not in POOL_SETTINGS:
+            raise ValueError(f"Unknown pool setting: {key}")
+    POOL_SETTINGS.update(settings)
+
+
+def _open_pooled_connection(db_path):
+    """Open a new connection in WAL mode with the pool's PRAGMA settings."""
+    db_path.parent.mkdir(parents=True, exist_ok=True)
+
+    # check_same_thread=False lets an idle connection move to another thread,
+    # the pool makes sure only one thread uses it at a time
+    conn = sqlite3.connect(
+        str(db_path),
+        timeout=POOL_SETTINGS["busy_timeout"] / 1000,
+        check_same_thread=False
+    )
+    conn.execute("PRAGMA foreign_keys = ON;")
+    conn.execute("PRAGMA journal_mode = WAL;")
+    conn.execute(f"PRAGMA synchronous = {POOL_SETTINGS['synchronous']};")
+    conn.execute(f"PRAGMA cache_size = {int(POOL_SETTINGS['cache_size'])};")
+    conn.execute(f"PRAGMA mmap_size = {int(POOL_SETTINGS['mmap_size'])};")
+    conn.execute(f"PRAGMA busy_timeout = {int(POOL_SETTINGS['busy_timeout'])};")
+
+    # Apply schema migrations once per process; a no-op when already current
+    if str(db_path) not in _migrated_paths:
+        with _migrate_lock:
+            if str(db_path) not in _migrated_paths:
+                try:
+                    migrate(conn)
+                except sqlite3.OperationalError as e:
+                    print(f"⚠️  Could not migrate {db_path}: {e} (run setup_database.py first)")
+                _migrated_paths.add(str(db_path))
+    return conn
+
+
+def get_connection(db_path=DB_PATH):
+    """
+    Get a pooled connection for the current thread.
+
+    - The same thread always gets the same connection back until it
+      releases it, so nested calls share one connection.
+    - Idle connections are reused instead of opening the file again.
+    - If max_connections are in use, waits for one to be released.
+
+    Returns:
+        sqlite3.Connection: Connection to pass back to release_connection()
+    """
+    key = str(db_path)
+    held = getattr(_thread_local, "held", None)
+    if held is None:
+        held = _thread_local.held = {}
+
+    # This thread already has a connection checked out
+    if key in held:
+        conn, depth = held[key]
+        held[key] = (conn, depth + 1)
+        with _pool_lock:
+            _pool_stats["hits"] += 1
+        return conn
+
+    with _pool_available:
+        idle = _idle_connections.setdefault(key, [])
+        opened = _open_connections.setdefault(key, [])
+
+        waited = False
+        while not idle and len(opened) + _opening.get(key, 0) >= POOL_SETTINGS["max_connections"]:
+            _reclaim_dead_threads(key)
+            if idle:
+                break
+            if not waited:
+                _pool_stats["waits"] += 1
+                waited = True
+            if not _pool_available.wait(timeout=POOL_SETTINGS["wait_timeout"]):
+                raise TimeoutError("Timed out waiting for a database connection")
+
+        if idle:
+            conn = idle.pop()
+            _pool_stats["hits"] += 1
+            _checked_out[id(conn)] = (key, conn, threading.current_thread())
+        else:
+            # Reserve the slot; opening the file (and migrating it) happens
+            # outside the lock so other threads can take idle connections
+            conn = None
+            _opening[key] = _opening.get(key, 0) + 1
+            _pool_stats["misses"] += 1
+
+    if conn is None:
+        try:
+            conn = _open_pooled_connection(db_path)
+        finally:
+            with _pool_available:
+                _opening[key] -= 1
+                if conn is not None:
+                    opened.append(conn)
+                    _checked_out[id(conn)] = (key, conn, threading.current_thread())
+                else:
+                    # The slot is free again
+                    _pool_available.notify()
+
+    held[key] = (conn, 1)
+    return conn
+
+
+def _reclaim_dead_threads(key):
+    """
+    Put connections back in the idle list if the thread holding them has
+    finished without releasing them (e.g. a Streamlit rerun was stopped).
+
+    Must be called with _pool_lock held.
+    """
+    for conn_id, (conn_key, conn, owner) in list(_checked_out.items()):
+        if conn_key == key and not owner.is_alive():
+            del _checked_out[conn_id]
+            if conn.in_transaction:
+                conn.rollback()
+            _idle_connections[key].append(conn)
+
+
+def release_connection(conn, db_path=DB_PATH):
+    """
+    Give a connection from get_connection() back to the pool.
+
+    Any open transaction is rolled back so the next user starts clean.
+    """
+    key = str(db_path)
+    held = getattr(_thread_local, "held", {})
+    if key not in held or held[key][0] is not conn:
+        return
+
+    conn, depth = held[key]
+    if depth > 1:
+        held[key] = (conn, depth - 1)
+        return
+
+    del held[key]
+    if conn.in_transaction:
+        conn.rollback()
+
+    with _pool_available:
+        _checked_out.pop(id(conn), None)
+        _idle_connections.setdefault(key, []).append(conn)
+        _pool_available.notify()
+
+
+@contextmanager
+def pooled_connection(db_path=DB_PATH):
+    """Context manager version of get_connection()/release_connection()."""
+    conn = get_connection(db_path)
+    try:
+        yield conn
+    finally:
+        release_connection(conn, db_path)
+
+
+def get_pool_stats():
+    """
+    Return pool statistics.
+
+    Returns:
+        dict: hits, misses, waits, open, idle and in_use connection counts
+    """
+    with _pool_lock:
+        open_count = sum(len(conns) for conns in _open_connections.values())
+        idle_count = sum(len(conns) for conns in _idle_connections.values())
+        stats = dict(_pool_stats)
+
+    stats["open"] = open_count
+    stats["idle"] = idle_count
+    stats["in_use"] = open_count - idle_count
+    return stats
+
+
+def close_pool():
+    """Close all idle pooled connections (e.g. at shutdown or in scripts)."""
+    with _pool_lock:
+        for key, idle in _idle_connections.items():
+            opened = _open_connections.get(key, [])
+            for conn in idle:
+                conn.close()
+                if conn in opened:
+                    opened.remove(conn)
+            idle.clear()
@@ -0,0 +1,137 @@
+"""
+Filter specs for the dashboard filter sections.
+
+A filter spec is a dict of {column: selection} built straight from the page
+widgets. build_where() turns it into one parameterized WHERE clause over
+indexed columns, so filtering happens in SQLite instead of on a copied
+DataFrame.
+
+Selections:
+    "All" / None / []    -> no filter on that column
+    "High"               -> column = ?
+    ["High", "Critical"] -> column IN (?, ?)
+    (low, high)          -> column BETWEEN ? AND ? (either end may be None)
+"""
+
+import pandas as pd
+
+# Columns each table may be filtered on (also guards the SQL we build)
+FILTER_COLUMNS = {
+    "cyber_incidents": {"severity", "status", "incident_type", "reported_by", "date"},
+    "it_tickets": {"priority", "status", "category", "assigned_to", "created_date"},
+    "datasets_metadata": {"category", "source", "file_size_mb", "last_updated"},
+}
+
+
+def build_where(table_name, spec):
+    """
+    Build a WHERE clause and its parameters from a filter spec.
+
+    Args:
+        table_name: cyber_incidents, it_tickets or datasets_metadata
+        spec: dict of {column: selection} (see module docstring)
+
+    Returns:
+        tuple: (list of SQL conditions, list of parameters)
+    """
+    if table_name not in FILTER_COLUMNS:
+        raise ValueError(f"Unknown table: {table_name}")
+
+    conditions = []
+    params = []
+    for column, value in (spec or {}).items():
+        if column not in FILTER_COLUMNS[table_name]:
+            raise ValueError(f"Can't filter {table_name} on {column}")
+
+        if value is None or value == "All":
+            continue
+
+        if isinstance(value, tuple):
+            low, high = value
+            if low is not None and high is not None:
+                conditions.append(f"{column} BETWEEN ? AND ?")
+                params.extend([low, high])
+            elif low is not None:
+                conditions.append(f"{column} >= ?")
+                params.append(low)
+            elif high is not None:
+                conditions.append(f"{column} <= ?")
+                params.append(high)
+        elif isinstance(value, (list, set)):
+            values = [v for v in value if v != "All"]
+            if values:
+                conditions.append(f"{column} IN ({', '.join('?' for _ in values)})")
+                params.extend(values)
+        else:
+            conditions.append(f"{column} = ?")
+            params.append(value)
+
+    return conditions, params
+
+
+def _where_sql(conditions):
+    """Join conditions into a WHERE clause (empty string if there are none)."""
+    return f"WHERE {' AND '.join(conditions)}" if conditions else ""
+
+
+def count_query(table_name, spec):
+    """
+    Build the query counting the rows matching a filter spec.
+
+    Returns:
+        tuple: (SQL, list of parameters)
+    """
+    conditions, params = build_where(table_name, spec)
+    return f"SELECT COUNT(*) FROM {table_name} {_where_sql(conditions)}", params
+
+
+def page_query(table_name, spec, after_id=None):
+    """
+    Build the newest-first page query for a filter spec.
+
+    The query ends in LIMIT ?; the caller appends the limit to the parameters.
+
+    Returns:
+        tuple: (SQL, list of parameters)
+    """
+    conditions, params = build_where(table_name, spec)
+    if after_id is not None:
+        conditions.append("id < ?")
+        params.append(after_id)
+    return f"SELECT * FROM {table_name} {_where_sql(conditions)} ORDER BY id DESC LIMIT ?", params
+
+
+def count_matching(conn, table_name, spec):
+    """Count the rows matching a filter spec."""
+    query, params = count_query(table_name, spec)
+    cur = conn.cursor()
+    cur.execute(query, params)
+    return cur.fetchone()[0]
+
+
+def filter_rows(conn, table_name, spec, after_id=None, page_size=50):
+    """
+    Return one page of rows matching a filter spec, plus the total count.
+
+    Args:
+        conn: Database connection
+        table_name: cyber_incidents, it_tickets or datasets_metadata
+        spec: Filter spec dict
+        after_id: Last id of the previous page (None for the first page)
+        page_size: Number of rows per page
+
+    Returns:
+        tuple: (DataFrame page newest first,
+                after_id for the next page or None,
+                total number of matching rows)
+    """
+    total = count_matching(conn, table_name, spec)
+
+    # Ask for one extra row to find out if there is a next page
+    query, params = page_query(table_name, spec, after_id)
+    df = pd.read_sql_query(query, conn, params=params + [page_size + 1])
+
+    if len(df) > page_size:
+        df = df.iloc[:page_size]
+        return df, int(df["id"].iloc[-1]), total
+    return df, None, total
@@ -5,6 +5,9 @@ From Week 8
 import pandas as pd
 from pathlib import Path
 from app.data.db import connect_database
+from app.data.pagination import fetch_page, DEFAULT_PAGE_SIZE
+from app.data.filters import filter_rows
+from app.data.cache import cached_query, bump_table_version
 
 
 def load_csv_to_table(conn, csv_path, table_name):
@@ -83,6 +86,7 @@ def load_csv_to_table(conn, csv_path, table_name):
         if_exists="append",
         index=False
     )
+    bump_table_version(table_name)
 
     row_cnt = len(df)
     print(f"✅ Loaded {row_cnt} rows from {csv_path.name} into {table_name}.")
@@ -111,9 +115,11 @@ def insert_incident(conn, date, incident_type, severity, status, description, re
     """, (date, incident_type, severity, status, description, reported_by))
 
     conn.commit()
+    bump_table_version("cyber_incidents")
     return cursor.lastrowid
 
 
+@cached_query("cyber_incidents")
 def get_all_incidents(conn):
     """
     Retrieve all incidents from the database.
@@ -127,6 +133,42 @@ def get_all_incidents(conn):
     )
 
 
+@cached_query("cyber_incidents")
+def get_incidents_page(conn, after_id=None, page_size=DEFAULT_PAGE_SIZE, filters=None):
+    """
+    Retrieve one page of incidents, newest first, using keyset pagination.
+
+    Args:
+        conn: Database connection
+        after_id: Last id of the previous page (None for the first page)
+        page_size: Number of incidents per page
+        filters: Optional dict such as {"severity": "High", "status": "Open"}
+
+    Returns:
+        tuple: (pandas.DataFrame page, after_id for the next page or None)
+    """
+    return fetch_page(conn, "cyber_incidents", after_id, page_size, filters)
+
+
+@cached_query("cyber_incidents")
+def filter_incidents(conn, spec, after_id=None, page_size=DEFAULT_PAGE_SIZE):
+    """
+    Retrieve one page of incidents matching a filter spec.
+
+    Args:
+        conn: Database connection
+        spec: Filter spec, e.g. {"severity": "High", "status": "All",
+              "incident_type": ["Phishing", "Malware"]}
+        after_id: Last id of the previous page (None for the first page)
+        page_size: Number of incidents per page
+
+    Returns:
+        tuple: (pandas.DataFrame page, after_id for the next page or None,
+                total number of matching incidents)
+    """
+    return filter_rows(conn, "cyber_incidents", spec, after_id, page_size)
+
+
 def update_incident_status(conn, incident_id, new_status):
     """
     Update the status of an incident.
@@ -139,6 +181,7 @@ def update_incident_status(conn, incident_id, new_status):
     )
 
     conn.commit()
+    bump_table_version("cyber_incidents")
     return cursor.rowcount
 
 
@@ -154,48 +197,59 @@ def delete_incident(conn, incident_id):
     )
 
     conn.commit()
+    bump_table_version("cyber_incidents")
     return cursor.rowcount
 
 
+# Analytical queries, also checked against the indexes by
+# app.data.migrations.check_query_plans()
+INCIDENTS_BY_TYPE_SQL = """
+SELECT incident_type, COUNT(*) as count
+FROM cyber_incidents
+GROUP BY incident_type
+ORDER BY count DESC
+"""
+
+HIGH_SEVERITY_BY_STATUS_SQL = """
+SELECT status, COUNT(*) as count
+FROM cyber_incidents
+WHERE severity = 'High'
+GROUP BY status
+ORDER BY count DESC
+"""
+
+# Parameter: min_count
+INCIDENT_TYPES_WITH_MANY_CASES_SQL = """
+SELECT incident_type, COUNT(*) as count
+FROM cyber_incidents
+GROUP BY incident_type
+HAVING COUNT(*) > ?
+ORDER BY count DESC
+"""
+
+
+@cached_query("cyber_incidents")
 def get_incidents_by_type_count(conn):
     """
     Count incidents by type.
     """
-    query = """
-    SELECT incident_type, COUNT(*) as count
-    FROM cyber_incidents
-    GROUP BY incident_type
-    ORDER BY count DESC
-    """
-    return pd.read_sql_query(query, conn)
+    return pd.read_sql_query(INCIDENTS_BY_TYPE_SQL, conn)
 
 
+@cached_query("cyber_incidents")
 def get_high_severity_by_status(conn):
     """
     Count high severity incidents by status.
     """
-    query = """
-    SELECT status, COUNT(*) as count
-    FROM cyber_incidents
-    WHERE severity = 'High'
-    GROUP BY status
-    ORDER BY count DESC
-    """
-    return pd.read_sql_query(query, conn)
+    return pd.read_sql_query(HIGH_SEVERITY_BY_STATUS_SQL, conn)
 
 
+@cached_query("cyber_incidents")
 def get_incident_types_with_many_cases(conn, min_count=5):
     """
     Find incident types with more than min_count cases.
     """
-    query = """
-    SELECT incident_type, COUNT(*) as count
-    FROM cyber_incidents
-    GROUP BY incident_type
-    HAVING COUNT(*) > ?
-    ORDER BY count DESC
-    """
-    return pd.read_sql_query(query, conn, params=(min_count,))
+    return pd.read_sql_query(INCIDENT_TYPES_WITH_MANY_CASES_SQL, conn, params=(min_count,))
 
 
 if __name__ == "__main__":
@@ -0,0 +1,183 @@
+"""
+KPI and chart aggregates for the dashboard pages.
+
+Everything is grouped in SQL, so the frames returned here have one row per
+group (severity, status, month, ...) no matter how many rows the tables hold.
+"""
+
+import pandas as pd
+from app.data.cache import cached_query
+
+# The grouped queries behind each page, also checked against the indexes
+# by app.data.migrations.check_query_plans()
+INCIDENT_METRICS_SQL = """
+SELECT severity, status, COUNT(*) AS count
+FROM cyber_incidents
+GROUP BY severity, status
+"""
+
+TICKET_METRICS_SQL = """
+SELECT priority, status, COUNT(*) AS count,
+       SUM(julianday(resolved_date) - julianday(created_date)) AS resolution_days,
+       COUNT(julianday(resolved_date) - julianday(created_date)) AS resolution_n
+FROM it_tickets
+GROUP BY priority, status
+"""
+
+DATASET_METRICS_SQL = """
+SELECT category, COUNT(*) AS count,
+       COALESCE(SUM(record_count), 0) AS records,
+       COALESCE(SUM(file_size_mb), 0) AS size_mb,
+       COUNT(file_size_mb) AS size_n
+FROM datasets_metadata
+GROUP BY category
+ORDER BY count DESC
+"""
+
+FILE_SIZE_RANGE_SQL = "SELECT MIN(file_size_mb), MAX(file_size_mb) FROM datasets_metadata"
+
+# Parameters: low, bin width, last bin
+FILE_SIZE_HISTOGRAM_SQL = """
+SELECT MIN(CAST((file_size_mb - ?) / ? AS INTEGER), ?) AS bin, COUNT(*) AS Count
+FROM datasets_metadata
+WHERE file_size_mb IS NOT NULL
+GROUP BY bin
+ORDER BY bin
+"""
+
+
+def monthly_counts_query(table_name, date_column):
+    """Build the rows-per-YYYY-MM query for a date column."""
+    return f"""
+    SELECT strftime('%Y-%m', {date_column}) AS Month, COUNT(*) AS Count
+    FROM {table_name}
+    WHERE strftime('%Y-%m', {date_column}) IS NOT NULL
+    GROUP BY Month
+    ORDER BY Month
+    """
+
+
+def _counts(df, column, label):
+    """Sum the 'count' column of a grouped frame by one of its columns."""
+    counts = df.groupby(column, dropna=False)["count"].sum().sort_values(ascending=False)
+    counts = counts.reset_index()
+    counts.columns = [label, "Count"]
+    return counts
+
+
+def _monthly_counts(conn, table_name, date_column):
+    """Count rows per YYYY-MM month of a date column."""
+    return pd.read_sql_query(monthly_counts_query(table_name, date_column), conn)
+
+
+@cached_query("cyber_incidents")
+def get_incident_metrics(conn):
+    """
+    Compute the Cybersecurity page KPIs and chart series.
+
+    Returns:
+        dict: total, high_severity, open, resolved (ints) and
+              severity_counts, status_counts, monthly_counts (DataFrames)
+    """
+    grouped = pd.read_sql_query(INCIDENT_METRICS_SQL, conn)
+
+    return {
+        "total": int(grouped["count"].sum()),
+        "high_severity": int(grouped.loc[grouped["severity"] == "High", "count"].sum()),
+        "open": int(grouped.loc[grouped["status"] == "Open", "count"].sum()),
+        "resolved": int(grouped.loc[grouped["status"] == "Resolved", "count"].sum()),
+        "severity_counts": _counts(grouped, "severity", "Severity"),
+        "status_counts": _counts(grouped, "status", "Status"),
+        "monthly_counts": _monthly_counts(conn, "cyber_incidents", "date"),
+    }
+
+
+@cached_query("it_tickets")
+def get_ticket_metrics(conn):
+    """
+    Compute the IT Operations page KPIs and chart series.
+
+    Returns:
+        dict: total, open, high_priority (ints), avg_resolution_days
+              (float or None) and priority_counts, status_counts,
+              monthly_counts (DataFrames)
+    """
+    grouped = pd.read_sql_query(TICKET_METRICS_SQL, conn)
+
+    # Average resolution time over Resolved tickets with valid dates
+    resolved = grouped[grouped["status"] == "Resolved"]
+    resolution_n = resolved["resolution_n"].sum()
+    avg_resolution = float(resolved["resolution_days"].sum() / resolution_n) if resolution_n else None
+
+    return {
+        "total": int(grouped["count"].sum()),
+        "open": int(grouped.loc[grouped["status"] == "Open", "count"].sum()),
+        "high_priority": int(grouped.loc[grouped["priority"] == "High", "count"].sum()),
+        "avg_resolution_days": avg_resolution,
+        "priority_counts": _counts(grouped, "priority", "Priority"),
+        "status_counts": _counts(grouped, "status", "Status"),
+        "monthly_counts": _monthly_counts(conn, "it_tickets", "created_date"),
+    }
+
+
+@cached_query("datasets_metadata")
+def get_dataset_metrics(conn):
+    """
+    Compute the Data Science page KPIs and per-category series.
+
+    Returns:
+        dict: total, total_records, total_size_mb, categories,
+              mean_size_mb and by_category (DataFrame with Category,
+              Count, Total Records)
+    """
+    grouped = pd.read_sql_query(DATASET_METRICS_SQL, conn)
+
+    size_n = grouped["size_n"].sum()
+    by_category = grouped[grouped["category"].notna()][["category", "count", "records"]]
+    by_category.columns = ["Category", "Count", "Total Records"]
+
+    return {
+        "total": int(grouped["count"].sum()),
+        "total_records": int(grouped["records"].sum()),
+        "total_size_mb": float(grouped["size_mb"].sum()),
+        "categories": int(grouped["category"].notna().sum()),
+        "mean_size_mb": float(grouped["size_mb"].sum() / size_n) if size_n else None,
+        "by_category": by_category.reset_index(drop=True),
+    }
+
+
+@cached_query("datasets_metadata")
+def get_file_size_histogram(conn, bins=20):
+    """
+    Bucket datasets by file_size_mb into equal-width bins in SQL.
+
+    Returns:
+        pandas.DataFrame: bin_start, bin_end, Count (one row per non-empty bin)
+    """
+    low, high = conn.execute(FILE_SIZE_RANGE_SQL).fetchone()
+    if low is None:
+        return pd.DataFrame(columns=["bin_start", "bin_end", "Count"])
+
+    width = (high - low) / bins or 1.0
+    hist = pd.read_sql_query(FILE_SIZE_HISTOGRAM_SQL, conn, params=(low, width, bins - 1))
+    hist["bin_start"] = low + hist["bin"] * width
+    hist["bin_end"] = hist["bin_start"] + width
+    return hist[["bin_start", "bin_end", "Count"]]
+
+
+@cached_query("datasets_metadata")
+def get_dataset_scatter_sample(conn, limit=2000):
+    """
+    Return the newest `limit` datasets for the record count / file size
+    scatter plot, so the chart stays small on large tables.
+    """
+    return pd.read_sql_query(
+        """
+        SELECT dataset_name, category, source, record_count, file_size_mb
+        FROM datasets_metadata
+        ORDER BY id DESC
+        LIMIT ?
+        """,
+        conn,
+        params=(limit,)
+    )
@@ -0,0 +1,255 @@
+"""
+Versioned schema migrations.
+
+The schema version is stored in PRAGMA user_version. Each migration runs
+once, in its own transaction, and bumps the version when it succeeds, so
+running migrate() on a database that is already current does nothing.
+
+Migrations:
+    1  indexes for the dashboard filters and analytical queries
+    2  changelog table, filled by triggers on every domain table and users
+    3  indexes for the remaining filter columns (reported_by, assigned_to,
+       last_updated)
+
+    python -m app.data.migrations    (apply migrations and check query plans)
+"""
+
+import itertools
+
+# (version, description, SQL statements)
+MIGRATIONS = [
+    (1, "Indexes for dashboard filters and analytical queries", [
+        # Cybersecurity filters: severity / status / incident_type.
+        # (severity, status) also covers get_high_severity_by_status.
+        # Every filter column also has an index of its own: its entries are
+        # in id order for one value, so "WHERE col = ? ORDER BY id DESC"
+        # pages walk the index instead of sorting every match
+        "CREATE INDEX IF NOT EXISTS idx_incidents_severity_status "
+        "ON cyber_incidents (severity, status, incident_type)",
+        "CREATE INDEX IF NOT EXISTS idx_incidents_severity ON cyber_incidents (severity)",
+        "CREATE INDEX IF NOT EXISTS idx_incidents_status ON cyber_incidents (status)",
+        "CREATE INDEX IF NOT EXISTS idx_incidents_type ON cyber_incidents (incident_type)",
+        "CREATE INDEX IF NOT EXISTS idx_incidents_date ON cyber_incidents (date)",
+
+        # IT Operations filters: priority / status / category.
+        # The date columns make it a covering index for get_ticket_metrics
+        "CREATE INDEX IF NOT EXISTS idx_tickets_priority_status "
+        "ON it_tickets (priority, status, category, created_date, resolved_date)",
+        "CREATE INDEX IF NOT EXISTS idx_tickets_priority ON it_tickets (priority)",
+        "CREATE INDEX IF NOT EXISTS idx_tickets_status ON it_tickets (status)",
+        "CREATE INDEX IF NOT EXISTS idx_tickets_category ON it_tickets (category)",
+        "CREATE INDEX IF NOT EXISTS idx_tickets_created_date ON it_tickets (created_date)",
+
+        # Data Science filters: category / source / file size range.
+        # record_count and file_size_mb make it covering for get_dataset_metrics
+        "CREATE INDEX IF NOT EXISTS idx_datasets_category_source "
+        "ON datasets_metadata (category, source, record_count, file_size_mb)",
+        "CREATE INDEX IF NOT EXISTS idx_datasets_category ON datasets_metadata (category)",
+        "CREATE INDEX IF NOT EXISTS idx_datasets_source ON datasets_metadata (source)",
+        "CREATE INDEX IF NOT EXISTS idx_datasets_file_size ON datasets_metadata (file_size_mb)",
+    ]),
+    (2, "Changelog table and change-data-capture triggers", [
+        # op is I / U / D, changed_at is unix seconds
+        """
+        CREATE TABLE IF NOT EXISTS changelog (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            table_name TEXT NOT NULL,
+            row_id INTEGER NOT NULL,
+            op TEXT NOT NULL,
+            changed_at INTEGER NOT NULL DEFAULT (CAST(strftime('%s', 'now') AS INTEGER))
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_changelog_row ON changelog (table_name, row_id)",
+        "CREATE INDEX IF NOT EXISTS idx_changelog_changed_at ON changelog (changed_at)",
+    ] + [
+        f"""
+        CREATE TRIGGER IF NOT EXISTS trg_{table}_{name}
+        AFTER {event} ON {table}
+        BEGIN
+            INSERT INTO changelog (table_name, row_id, op) VALUES ('{table}', {ref}.id, '{op}');
+        END
+        """
+        for table in ("cyber_incidents", "it_tickets", "datasets_metadata", "users")
+        for name, event, ref, op in (
+            ("insert", "INSERT", "NEW", "I"),
+            ("update", "UPDATE", "NEW", "U"),
+            ("delete", "DELETE", "OLD", "D"),
+        )
+    ]),
+    (3, "Indexes for the remaining dashboard filter columns", [
+        "CREATE INDEX IF NOT EXISTS idx_incidents_reported_by ON cyber_incidents (reported_by)",
+        "CREATE INDEX IF NOT EXISTS idx_tickets_assigned_to ON it_tickets (assigned_to)",
+        "CREATE INDEX IF NOT EXISTS idx_datasets_last_updated ON datasets_metadata (last_updated)",
+    ]),
+]
+
+# Filter columns the pages send as a (low, high) range rather than a value
+_RANGE_FILTERS = {"date", "created_date", "last_updated", "file_size_mb"}
+
+# The filter sections of the Cybersecurity, IT Operations and Data Science
+# pages; any combination of these may be set at once
+_PAGE_FILTERS = {
+    "cyber_incidents": ("severity", "status", "incident_type"),
+    "it_tickets": ("priority", "status", "category"),
+    "datasets_metadata": ("category", "source", "file_size_mb"),
+}
+
+
+def get_indexed_queries():
+    """
+    Build the queries the data layer runs, for check_query_plans().
+
+    The SQL comes from the same constants and query builders the data layer
+    uses, so the check covers what actually ships: the analytical incident
+    queries, the page metrics, a filtered count, first page and value list
+    for every filter column, and a count, first page and next page for
+    every combination of filters a page can send. Unfiltered newest-first
+    pages are left out; they walk the primary key and stop at the LIMIT.
+
+    A range filter is read from its index in value order, so a page
+    filtered on one has to sort its matches; those queries are marked
+    sort_ok. The pages only send a range once the user has narrowed it.
+
+    Returns:
+        dict: {query_name: (sql, params, sort_ok)}
+    """
+    # Imported here: the data layer imports app.data.db, which imports this module
+    from app.data import incidents, metrics
+    from app.data.filters import FILTER_COLUMNS, count_query, page_query
+    from app.data.pagination import distinct_values_query, column_range_query
+
+    queries = {
+        "get_incidents_by_type_count": (incidents.INCIDENTS_BY_TYPE_SQL, [], False),
+        "get_high_severity_by_status": (incidents.HIGH_SEVERITY_BY_STATUS_SQL, [], False),
+        "get_incident_types_with_many_cases": (incidents.INCIDENT_TYPES_WITH_MANY_CASES_SQL, [5], False),
+        "get_incident_metrics": (metrics.INCIDENT_METRICS_SQL, [], False),
+        "get_incident_metrics monthly": (metrics.monthly_counts_query("cyber_incidents", "date"), [], False),
+        "get_ticket_metrics": (metrics.TICKET_METRICS_SQL, [], False),
+        "get_ticket_metrics monthly": (metrics.monthly_counts_query("it_tickets", "created_date"), [], False),
+        "get_dataset_metrics": (metrics.DATASET_METRICS_SQL, [], False),
+        "get_file_size_histogram range": (metrics.FILE_SIZE_RANGE_SQL, [], False),
+        "get_file_size_histogram": (metrics.FILE_SIZE_HISTOGRAM_SQL, [0, 1, 19], False),
+    }
+
+    for table_name, columns in FILTER_COLUMNS.items():
+        for column in sorted(columns):
+            is_range = column in _RANGE_FILTERS
+            spec = {column: (0, 1) if is_range else "x"}
+            sql, params = count_query(table_name, spec)
+            queries[f"count_matching {table_name}.{column}"] = (sql, params, False)
+            sql, params = page_query(table_name, spec)
+            queries[f"fetch_page {table_name}.{column}"] = (sql, params + [51], is_range)
+            if is_range:
+                queries[f"get_column_range {table_name}.{column}"] = (
+                    column_range_query(table_name, column), [], False)
+            else:
+                queries[f"get_distinct_values {table_name}.{column}"] = (
+                    distinct_values_query(table_name, column), [], False)
+
+    for table_name, columns in _PAGE_FILTERS.items():
+        for size in range(1, len(columns) + 1):
+            for combo in itertools.combinations(columns, size):
+                spec = {column: (0, 1) if column in _RANGE_FILTERS else "x" for column in combo}
+                label = f"{table_name}.{'+'.join(combo)}"
+                has_range = any(column in _RANGE_FILTERS for column in combo)
+                if size > 1:
+                    sql, params = count_query(table_name, spec)
+                    queries[f"count_matching {label}"] = (sql, params, False)
+                    sql, params = page_query(table_name, spec)
+                    queries[f"fetch_page {label}"] = (sql, params + [51], has_range)
+                sql, params = page_query(table_name, spec, after_id=1000)
+                queries[f"fetch_page {label} next page"] = (sql, params + [51], has_range)
+
+    return queries
+
+
+def get_schema_version(conn):
+    """Return the schema version stored in PRAGMA user_version."""
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrate(conn):
+    """
+    Apply any migrations newer than the database's user_version.
+
+    Args:
+        conn: Database connection
+
+    Returns:
+        int: Number of migrations applied (0 if the schema was current)
+    """
+    current = get_schema_version(conn)
+    pending = [m for m in MIGRATIONS if m[0] > current]
+    if not pending:
+        return 0
+
+    if conn.in_transaction:
+        conn.commit()
+
+    for version, description, statements in pending:
+        try:
+            conn.execute("BEGIN")
+            for sql in statements:
+                conn.execute(sql)
+            # PRAGMA can't take a parameter, version is an int from MIGRATIONS
+            conn.execute(f"PRAGMA user_version = {int(version)}")
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        print(f"✅ Applied migration {version}: {description}")
+
+    return len(pending)
+
+
+def _plan_uses_index(sql, details, sort_ok=False):
+    """
+    Decide from EXPLAIN QUERY PLAN lines whether a query is served by an index.
+
+    Every table access must be a SEARCH (an index or rowid range) or a SCAN
+    of a covering index; a SCAN through a non-covering index still reads
+    every row, and more slowly than the table itself. Unless sort_ok, a
+    query with a LIMIT must also not sort its matches ("USE TEMP B-TREE FOR
+    ORDER BY"), or it reads all of them before it can return the first page.
+    """
+    accesses = [d for d in details if d.startswith(("SCAN", "SEARCH"))]
+    if not accesses:
+        return False
+    for detail in accesses:
+        if detail.startswith("SCAN") and "USING COVERING INDEX" not in detail:
+            return False
+    sorts = any("USE TEMP B-TREE FOR ORDER BY" in detail for detail in details)
+    if sorts and not sort_ok and "LIMIT" in sql.upper():
+        return False
+    return True
+
+
+def check_query_plans(conn):
+    """
+    Run EXPLAIN QUERY PLAN on every query from get_indexed_queries().
+
+    Returns:
+        dict: {query_name: (uses_index: bool, plan: str)}
+    """
+    results = {}
+    for name, (sql, params, sort_ok) in get_indexed_queries().items():
+        details = [row[-1] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}", params)]
+        results[name] = (_plan_uses_index(sql, details, sort_ok), "; ".join(details))
+    return results
+
+
+if __name__ == "__main__":
+    from app.data.db import connect_database
+
+    conn = connect_database()
+    migrate(conn)
+    results = check_query_plans(conn)
+    conn.close()
+
+    for name, (uses_index, plan) in results.items():
+        print(f"  {name}: {'✅' if uses_index else '❌'} {plan}")
+    missing = [name for name, (uses_index, _) in results.items() if not uses_index]
+    if missing:
+        print(f"❌ {len(missing)} of {len(results)} queries scan a whole table")
+        raise SystemExit(1)
+    print(f"✅ All {len(results)} queries use an index")
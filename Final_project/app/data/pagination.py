@@ -0,0 +1,73 @@
+"""
+Keyset (cursor) pagination for the domain tables.
+
+Pages are ordered newest first (id DESC). Instead of OFFSET, the next page
+starts after the last id of the previous one (WHERE id < after_id), so every
+page is a short index range scan no matter how deep into the table it is.
+"""
+
+import pandas as pd
+from app.data.filters import FILTER_COLUMNS, page_query
+from app.data.cache import cached_query
+
+DEFAULT_PAGE_SIZE = 50
+
+
+def fetch_page(conn, table_name, after_id=None, page_size=DEFAULT_PAGE_SIZE, filters=None):
+    """
+    Fetch one page of rows, newest first.
+
+    Args:
+        conn: Database connection
+        table_name: cyber_incidents, it_tickets or datasets_metadata
+        after_id: id of the last row of the previous page (None for the first page)
+        page_size: Number of rows per page
+        filters: Optional filter spec (see app/data/filters.py)
+
+    Returns:
+        tuple: (DataFrame of at most page_size rows,
+                after_id for the next page or None if this is the last page)
+    """
+    # Ask for one extra row to find out if there is a next page
+    query, params = page_query(table_name, filters, after_id)
+    df = pd.read_sql_query(query, conn, params=params + [page_size + 1])
+
+    if len(df) > page_size:
+        df = df.iloc[:page_size]
+        return df, int(df["id"].iloc[-1])
+    return df, None
+
+
+def _check_filter_column(table_name, column):
+    """Only filter columns may be put into the SQL below."""
+    if column not in FILTER_COLUMNS.get(table_name, set()):
+        raise ValueError(f"Can't filter {table_name} on {column}")
+
+
+def distinct_values_query(table_name, column):
+    """Build the query listing the distinct non-null values of a filter column."""
+    _check_filter_column(table_name, column)
+    return f"SELECT DISTINCT {column} FROM {table_name} WHERE {column} IS NOT NULL ORDER BY {column}"
+
+
+def column_range_query(table_name, column):
+    """Build the query for (min, max) of a filter column."""
+    _check_filter_column(table_name, column)
+    return f"SELECT MIN({column}), MAX({column}) FROM {table_name}"
+
+
+@cached_query(table_param="table_name")
+def get_distinct_values(conn, table_name, column):
+    """Return the sorted distinct non-null values of a filter column."""
+    cur = conn.cursor()
+    cur.execute(distinct_values_query(table_name, column))
+    return [row[0] for row in cur.fetchall()]
+
+
+@cached_query(table_param="table_name")
+def get_column_range(conn, table_name, column):
+    """Return (min, max) of a numeric filter column, or (None, None) if empty."""
+    cur = conn.cursor()
+    cur.execute(column_range_query(table_name, column))
+    return cur.fetchone()
+
@@ -6,6 +6,9 @@ import pandas as pd
 from pathlib import Path
 from app.data.db import connect_database
 from app.data.incidents import load_csv_to_table
+from app.data.pagination import fetch_page, DEFAULT_PAGE_SIZE
+from app.data.filters import filter_rows
+from app.data.cache import cached_query, bump_table_version
 
 
 def load_tickets_csv(conn, csv_path):
@@ -28,14 +31,28 @@ def insert_ticket(conn, ticket_id, priority, status, category, subject, descript
          created_date, resolved_date, assigned_to)
     )
     conn.commit()
+    bump_table_version("it_tickets")
     return cur.lastrowid
 
 
+@cached_query("it_tickets")
 def get_all_tickets(conn):
     """Return a DataFrame of all tickets."""
     return pd.read_sql_query("SELECT * FROM it_tickets ORDER BY id DESC", conn)
 
 
+@cached_query("it_tickets")
+def get_tickets_page(conn, after_id=None, page_size=DEFAULT_PAGE_SIZE, filters=None):
+    """Return (page of tickets newest first, after_id for the next page or None)."""
+    return fetch_page(conn, "it_tickets", after_id, page_size, filters)
+
+
+@cached_query("it_tickets")
+def filter_tickets(conn, spec, after_id=None, page_size=DEFAULT_PAGE_SIZE):
+    """Return (page of tickets matching spec, next after_id or None, total matches)."""
+    return filter_rows(conn, "it_tickets", spec, after_id, page_size)
+
+
 def update_ticket_status(conn, ticket_id, new_status):
     """Update the status of an IT ticket."""
     cur = conn.cursor()
@@ -44,6 +61,7 @@ def update_ticket_status(conn, ticket_id, new_status):
         (new_status, ticket_id)
     )
     conn.commit()
+    bump_table_version("it_tickets")
     return cur.rowcount
 
 
@@ -55,4 +73,5 @@ def delete_ticket(conn, ticket_id):
         (ticket_id,)
     )
     conn.commit()
+    bump_table_version("it_tickets")
     return cur.rowcount
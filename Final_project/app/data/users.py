@@ -2,13 +2,79 @@
 From Week 8 - Polished
 """
 
-# Import the database connection function
-from app.data.db import connect_database
+import threading
+import time
+from collections import OrderedDict
+
+# Import the pooled database connection functions
+from app.data.db import get_connection, release_connection, pooled_connection
+from app.data.cache import bump_table_version
+
+# In-process cache of user rows, so logins and "username already exists"
+# checks don't go to the database every time
+USER_CACHE_SETTINGS = {
+    "max_entries": 10000,
+    "ttl_seconds": 300,
+    # Usernames known not to exist; kept shorter, since another process
+    # (e.g. bulk provisioning) may create them
+    "max_negative_entries": 10000,
+    "negative_ttl_seconds": 30,
+}
+
+_user_cache_lock = threading.Lock()
+_user_cache = OrderedDict()         # username -> (user row, expires)
+_missing_users = OrderedDict()      # username -> expires
+# username -> write generation, bumped by invalidate_user; a lookup only
+# caches its result if no write happened while it was reading
+_user_generations = {}
+_user_cache_stats = {"hits": 0, "negative_hits": 0, "misses": 0, "evictions": 0}
+
+
+def _cache_put(entries, key, value, max_entries):
+    """Add to an LRU dict, evicting the oldest entries. Called with the lock held."""
+    entries[key] = value
+    entries.move_to_end(key)
+    while len(entries) > max_entries:
+        entries.popitem(last=False)
+        _user_cache_stats["evictions"] += 1
+
+
+def invalidate_user(username):
+    """Drop a username from the cache (both found and not-found entries)."""
+    with _user_cache_lock:
+        _user_cache.pop(username, None)
+        _missing_users.pop(username, None)
+        _user_generations[username] = _user_generations.get(username, 0) + 1
+
+
+def get_user_cache_stats():
+    """
+    Return user cache statistics.
+    
+    Returns:
+        dict: hits, negative_hits, misses, evictions, entries and negative_entries
+    """
+    with _user_cache_lock:
+        stats = dict(_user_cache_stats)
+        stats["entries"] = len(_user_cache)
+        stats["negative_entries"] = len(_missing_users)
+    return stats
+
+
+def clear_user_cache():
+    """Empty the user cache."""
+    with _user_cache_lock:
+        _user_cache.clear()
+        _missing_users.clear()
+
 
 def get_user_by_username(username):
     """
     Get a user from the database by their username.
     
+    Results (including "not found") are cached for a short time; writes
+    through insert_user and update_password_hash invalidate them.
+    
     Args:
         username (str): The username to search for
     
@@ -17,8 +83,25 @@ def get_user_by_username(username):
         None: If user not found
     """
     
-    # Connect to the database
-    conn = connect_database()
+    now = time.monotonic()
+    with _user_cache_lock:
+        entry = _user_cache.get(username)
+        if entry is not None and entry[1] > now:
+            _user_cache.move_to_end(username)
+            _user_cache_stats["hits"] += 1
+            return entry[0]
+        
+        missing_until = _missing_users.get(username)
+        if missing_until is not None and missing_until > now:
+            _missing_users.move_to_end(username)
+            _user_cache_stats["negative_hits"] += 1
+            return None
+        
+        _user_cache_stats["misses"] += 1
+        generation = _user_generations.get(username, 0)
+    
+    # Borrow a connection from the pool
+    conn = get_connection()
     cursor = conn.cursor()
     
     # Use parameterized query to prevent SQL injection
@@ -29,8 +112,21 @@ def get_user_by_username(username):
     
     user = cursor.fetchone()
     
-    # Close the database connection
-    conn.close()
+    # Give the connection back to the pool
+    release_connection(conn)
+    
+    with _user_cache_lock:
+        if _user_generations.get(username, 0) != generation:
+            # The user was written while we were reading; what we read may be stale
+            return user
+        if user is not None:
+            _missing_users.pop(username, None)
+            _cache_put(_user_cache, username, (user, now + USER_CACHE_SETTINGS["ttl_seconds"]),
+                       USER_CACHE_SETTINGS["max_entries"])
+        else:
+            _user_cache.pop(username, None)
+            _cache_put(_missing_users, username, now + USER_CACHE_SETTINGS["negative_ttl_seconds"],
+                       USER_CACHE_SETTINGS["max_negative_entries"])
     
     return user
 
@@ -47,24 +143,55 @@ def insert_user(username, password_hash, role='user'):
         int: The ID of the newly inserted user
     """
     
-    conn = connect_database()
-    cursor = conn.cursor()
-    
-    # Insert the new user
-    cursor.execute(
-        "INSERT INTO users (username, password_hash, role) VALUES (?, ?, ?)",
-        (username, password_hash, role)
-    )
+    # pooled_connection() hands the connection back even if the INSERT fails
+    with pooled_connection() as conn:
+        cursor = conn.cursor()
+        
+        # Insert the new user
+        cursor.execute(
+            "INSERT INTO users (username, password_hash, role) VALUES (?, ?, ?)",
+            (username, password_hash, role)
+        )
+        
+        # Get the ID of the newly inserted user
+        new_user_id = cursor.lastrowid
+        
+        # Save changes to database
+        conn.commit()
+    
+    bump_table_version("users")
+    invalidate_user(username)
     
-    # Get the ID of the newly inserted user
-    new_user_id = cursor.lastrowid
+    return new_user_id
+
+def update_password_hash(user_id, password_hash):
+    """
+    Replace a user's stored password hash.
     
-    # Save changes to database
-    conn.commit()
+    Args:
+        user_id (int): The user's ID
+        password_hash (str): The new hashed password
     
-    conn.close()
+    Returns:
+        bool: True if a user was updated
+    """
     
-    return new_user_id
+    with pooled_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT username FROM users WHERE id = ?", (user_id,))
+        row = cursor.fetchone()
+        cursor.execute(
+            "UPDATE users SET password_hash = ? WHERE id = ?",
+            (password_hash, user_id)
+        )
+        updated = cursor.rowcount > 0
+        conn.commit()
+    
+    bump_table_version("users")
+    if row is not None:
+        invalidate_user(row[0])
+    
+    return updated
 
 def get_all_users():
     """
@@ -73,11 +200,11 @@ def get_all_users():
     Returns:
         list: List of all users as tuples
     """
-    conn = connect_database()
+    conn = get_connection()
     cursor = conn.cursor()
     
     cursor.execute("SELECT * FROM users")
     users = cursor.fetchall()
     
-    conn.close()
+    release_connection(conn)
     return users
\ No newline at end of file
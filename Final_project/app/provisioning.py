@@ -0,0 +1,152 @@
+"""
+Bulk user provisioning from a CSV of username, role and password.
+
+Every row is validated with the same rules as the register form, the
+passwords are hashed in parallel across all cores, and the users are
+inserted in a single transaction. Rows that fail are reported with their
+line number and reason; the rest are still created.
+
+Usage:
+    python -m app.provisioning team.csv
+"""
+
+import csv
+import os
+import sqlite3
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+
+from app.auth import hash_password, validate_username, validate_password, BCRYPT_SETTINGS
+from app.data.db import pooled_connection
+from app.data.cache import bump_table_version
+
+
+def read_users_csv(csv_path):
+    """
+    Read a provisioning CSV with a header row: username, role, password.
+
+    Returns:
+        list: dicts with line, username, role and password (role defaults
+              to 'user' when blank)
+    """
+    rows = []
+    with open(csv_path, newline="", encoding="utf-8") as f:
+        reader = csv.DictReader(f)
+        for line, record in enumerate(reader, start=2):
+            rows.append({
+                "line": line,
+                "username": (record.get("username") or "").strip(),
+                "role": (record.get("role") or "").strip() or "user",
+                "password": record.get("password") or "",
+            })
+    return rows
+
+
+def _existing_usernames(conn, usernames, batch=500):
+    """Return which of usernames are already in the users table."""
+    usernames = list(usernames)
+    found = set()
+    cur = conn.cursor()
+    for start in range(0, len(usernames), batch):
+        part = usernames[start:start + batch]
+        cur.execute(
+            f"SELECT username FROM users WHERE username IN ({', '.join('?' for _ in part)})",
+            part
+        )
+        found.update(row[0] for row in cur.fetchall())
+    return found
+
+
+def provision_users(rows, max_workers=None, rounds=None):
+    """
+    Create many users at once.
+
+    Args:
+        rows: dicts with line, username, role and password (see read_users_csv)
+        max_workers: Hashing processes (default: one per core)
+        rounds: bcrypt cost (default: BCRYPT_SETTINGS)
+
+    Returns:
+        tuple: (number of users created,
+                list of (line, username, error message) for rejected rows)
+    """
+    errors = []
+    valid = []
+    seen = set()
+
+    # Validate everything before doing any hashing
+    for row in rows:
+        ok, message = validate_username(row["username"])
+        if ok:
+            ok, message = validate_password(row["password"])
+        if ok and row["username"] in seen:
+            ok, message = False, "Username appears more than once in the file"
+        if not ok:
+            errors.append((row["line"], row["username"], message))
+            continue
+        seen.add(row["username"])
+        valid.append(row)
+
+    with pooled_connection() as conn:
+        existing = _existing_usernames(conn, seen)
+    for row in [r for r in valid if r["username"] in existing]:
+        errors.append((row["line"], row["username"], "Username already exists"))
+    valid = [r for r in valid if r["username"] not in existing]
+
+    if not valid:
+        return 0, sorted(errors)
+
+    # Hash in parallel; bcrypt is CPU-bound so this scales with cores
+    max_workers = max_workers or os.cpu_count() or 2
+    rounds = rounds or BCRYPT_SETTINGS["rounds"]
+    chunksize = max(1, len(valid) // (max_workers * 4))
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        hashes = list(pool.map(
+            hash_password,
+            (row["password"] for row in valid),
+            repeat(rounds),
+            chunksize=chunksize
+        ))
+
+    # One transaction for every insert; a failing row is skipped, not fatal
+    created = 0
+    with pooled_connection() as conn:
+        cur = conn.cursor()
+        try:
+            cur.execute("BEGIN IMMEDIATE")
+            for row, password_hash in zip(valid, hashes):
+                try:
+                    cur.execute(
+                        "INSERT INTO users (username, password_hash, role) VALUES (?, ?, ?)",
+                        (row["username"], password_hash, row["role"])
+                    )
+                    created += 1
+                except sqlite3.IntegrityError as e:
+                    errors.append((row["line"], row["username"], str(e)))
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+
+    bump_table_version("users")
+    return created, sorted(errors)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Create users from a CSV (username,role,password)")
+    parser.add_argument("csv_path", help="CSV file with a username,role,password header")
+    parser.add_argument("--workers", type=int, default=None, help="Hashing processes (default: all cores)")
+    args = parser.parse_args()
+
+    rows = read_users_csv(args.csv_path)
+    start = time.perf_counter()
+    created, errors = provision_users(rows, max_workers=args.workers)
+    elapsed = time.perf_counter() - start
+
+    for line, username, message in errors:
+        print(f"⚠️  Line {line} ({username or 'no username'}): {message}")
+    print(f"✅ Created {created} of {len(rows)} users in {elapsed:.2f}s "
+          f"({created / elapsed if elapsed else 0:.1f} users/s)")
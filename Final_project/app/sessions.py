@@ -0,0 +1,206 @@
+"""
+Server-side login sessions.
+
+A successful login creates a session and hands out a signed token:
+
+    <session id>.<user id>.<expires>.<user epoch>.<HMAC-SHA256 signature>
+
+Checking a token is a signature check plus a few dict lookups, so page
+guards never touch bcrypt or the database. Every user has an epoch number
+stored in the token; bumping it (revoke_user_sessions) makes all of that
+user's tokens invalid at once.
+
+Sessions live in this process. Set SESSION_SECRET so tokens stay valid
+across restarts of the signing key; the sessions themselves don't.
+
+The token itself never goes into a URL. To pick a session back up after
+a page reload, the browser gets a reconnect nonce instead: random, bound
+to the client's IP, valid for a short time and usable once
+(issue_reconnect_nonce / redeem_reconnect_nonce).
+"""
+
+import hashlib
+import hmac
+import os
+import secrets
+import threading
+import time
+
+SESSION_SETTINGS = {
+    # How long a token is valid for, in seconds
+    "ttl_seconds": 8 * 3600,
+    # Key used to sign tokens
+    "secret": os.environ.get("SESSION_SECRET", "").encode("utf-8") or secrets.token_bytes(32),
+    # Expired sessions are swept after this many new sessions
+    "sweep_every": 256,
+    # How long a reconnect nonce can be redeemed for, in seconds
+    "reconnect_ttl_seconds": 15 * 60,
+}
+
+_sessions_lock = threading.Lock()
+_sessions = {}          # session id -> (user_info, expires)
+_user_epochs = {}       # user id -> epoch, bumped to revoke all of a user's tokens
+_created_since_sweep = {"count": 0}
+_reconnect = {}         # nonce -> (token, client, expires)
+_session_nonces = {}    # session id -> its current nonce
+
+
+def _sign(payload):
+    """HMAC-SHA256 signature of a token payload."""
+    return hmac.new(SESSION_SETTINGS["secret"], payload.encode("utf-8"), hashlib.sha256).hexdigest()
+
+
+def _sweep_expired(now):
+    """Drop expired sessions. Called with _sessions_lock held."""
+    expired = [sid for sid, (_, expires) in _sessions.items() if expires <= now]
+    for sid in expired:
+        del _sessions[sid]
+        _reconnect.pop(_session_nonces.pop(sid, None), None)
+    expired = [nonce for nonce, (_, _, expires) in _reconnect.items() if expires <= now]
+    for nonce in expired:
+        _drop_nonce(nonce)
+
+
+def _drop_nonce(nonce):
+    """Forget a reconnect nonce. Called with _sessions_lock held."""
+    entry = _reconnect.pop(nonce, None)
+    if entry is not None:
+        session_id = entry[0].split(".", 1)[0]
+        if _session_nonces.get(session_id) == nonce:
+            del _session_nonces[session_id]
+    return entry
+
+
+def create_session(user_info):
+    """
+    Start a session for a user who just logged in.
+
+    Args:
+        user_info: dict with at least 'id', 'username' and 'role'
+
+    Returns:
+        str: Signed session token
+    """
+    now = int(time.time())
+    expires = now + SESSION_SETTINGS["ttl_seconds"]
+    session_id = secrets.token_urlsafe(16)
+    user_id = user_info["id"]
+
+    with _sessions_lock:
+        epoch = _user_epochs.get(user_id, 0)
+        _sessions[session_id] = (dict(user_info), expires)
+
+        _created_since_sweep["count"] += 1
+        if _created_since_sweep["count"] >= SESSION_SETTINGS["sweep_every"]:
+            _sweep_expired(now)
+            _created_since_sweep["count"] = 0
+
+    payload = f"{session_id}.{user_id}.{expires}.{epoch}"
+    return f"{payload}.{_sign(payload)}"
+
+
+def validate_session(token):
+    """
+    Check a session token.
+
+    Returns:
+        dict: The user's info if the token is valid, otherwise None
+    """
+    if not token:
+        return None
+
+    try:
+        session_id, user_id, expires, epoch, signature = token.split(".")
+        user_id, expires, epoch = int(user_id), int(expires), int(epoch)
+    except ValueError:
+        return None
+
+    payload = f"{session_id}.{user_id}.{expires}.{epoch}"
+    if not hmac.compare_digest(signature, _sign(payload)):
+        return None
+
+    if expires <= time.time():
+        with _sessions_lock:
+            _sessions.pop(session_id, None)
+        return None
+
+    with _sessions_lock:
+        if epoch != _user_epochs.get(user_id, 0):
+            return None
+        entry = _sessions.get(session_id)
+
+    if entry is None:
+        return None
+    return dict(entry[0])
+
+
+def revoke_session(token):
+    """Log out a single session."""
+    if not token:
+        return
+    session_id = token.split(".", 1)[0]
+    with _sessions_lock:
+        _sessions.pop(session_id, None)
+        _drop_nonce(_session_nonces.get(session_id))
+
+
+def issue_reconnect_nonce(token, client=None):
+    """
+    Hand out a one-time nonce that can be swapped for the token later.
+
+    Each session has one nonce at a time; issuing a new one cancels the
+    previous one, so only the newest link works.
+
+    Args:
+        token: A valid session token
+        client: Client IP the nonce is bound to (None: not bound)
+
+    Returns:
+        str: The nonce
+    """
+    nonce = secrets.token_urlsafe(24)
+    session_id = token.split(".", 1)[0]
+    expires = time.time() + SESSION_SETTINGS["reconnect_ttl_seconds"]
+    with _sessions_lock:
+        _drop_nonce(_session_nonces.get(session_id))
+        _reconnect[nonce] = (token, client, expires)
+        _session_nonces[session_id] = nonce
+    return nonce
+
+
+def redeem_reconnect_nonce(nonce, client=None):
+    """
+    Swap a reconnect nonce for its session token. A nonce works once.
+
+    Returns:
+        str: The token, or None if the nonce is unknown, used, expired or
+             from another client (the token still has to be validated)
+    """
+    if not nonce:
+        return None
+    with _sessions_lock:
+        entry = _drop_nonce(nonce)
+    if entry is None:
+        return None
+    token, bound_client, expires = entry
+    if expires <= time.time() or (bound_client is not None and bound_client != client):
+        return None
+    return token
+
+
+def revoke_user_sessions(user_id):
+    """Log out every session a user has, on every browser."""
+    with _sessions_lock:
+        _user_epochs[user_id] = _user_epochs.get(user_id, 0) + 1
+
+
+def get_session_stats():
+    """
+    Return session store statistics.
+
+    Returns:
+        dict: sessions (including expired ones not swept yet) and users with
+              revoked sessions
+    """
+    with _sessions_lock:
+        return {"sessions": len(_sessions), "revoked_users": len(_user_epochs)}
@@ -0,0 +1,112 @@
+"""
+Token-bucket throttling for login and registration.
+
+Each username and each client (IP address) has a bucket of attempts that
+refills at a steady rate. An attempt takes one token from both buckets;
+if either is empty the attempt is rejected before any bcrypt work is done.
+Buckets are kept in an LRU so a flood of made-up usernames can't grow
+memory without limit.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+THROTTLE_SETTINGS = {
+    # Attempts allowed in a burst, and tokens added back per second
+    "username_capacity": 5,
+    "username_refill_per_sec": 5 / 60,
+    "client_capacity": 20,
+    "client_refill_per_sec": 20 / 60,
+    # Buckets kept per kind before the least recently used are dropped
+    "max_buckets": 10000,
+}
+
+
+class LoginThrottled(RuntimeError):
+    """Raised when a username or client has run out of login attempts."""
+
+    def __init__(self, message, retry_after):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+_throttle_lock = threading.Lock()
+_buckets = {"username": OrderedDict(), "client": OrderedDict()}  # key -> (tokens, last refill time)
+_throttle_stats = {"allowed": 0, "rejected_username": 0, "rejected_client": 0, "evictions": 0}
+
+
+def _refill(kind, key, now):
+    """Return the bucket's current token count. Called with _throttle_lock held."""
+    capacity = THROTTLE_SETTINGS[f"{kind}_capacity"]
+    rate = THROTTLE_SETTINGS[f"{kind}_refill_per_sec"]
+
+    buckets = _buckets[kind]
+    tokens, last = buckets.get(key, (capacity, now))
+    tokens = min(capacity, tokens + (now - last) * rate)
+
+    buckets[key] = (tokens, now)
+    buckets.move_to_end(key)
+    while len(buckets) > THROTTLE_SETTINGS["max_buckets"]:
+        buckets.popitem(last=False)
+        _throttle_stats["evictions"] += 1
+    return tokens
+
+
+def _retry_after(kind, tokens):
+    """Seconds until a bucket holding tokens has one whole token again."""
+    return (1 - tokens) / THROTTLE_SETTINGS[f"{kind}_refill_per_sec"]
+
+
+def check_login_allowed(username, client=None):
+    """
+    Take one attempt from the username's and the client's buckets.
+
+    Args:
+        username: Username being tried (case-insensitive)
+        client: Client identifier such as the IP address, if known
+
+    Raises:
+        LoginThrottled: If either bucket is empty (nothing is taken then)
+    """
+    now = time.monotonic()
+    checks = [("username", (username or "").lower())]
+    if client:
+        checks.append(("client", client))
+
+    with _throttle_lock:
+        levels = [(kind, key, _refill(kind, key, now)) for kind, key in checks]
+
+        for kind, _, tokens in levels:
+            if tokens < 1:
+                _throttle_stats[f"rejected_{kind}"] += 1
+                raise LoginThrottled(
+                    "Too many login attempts, please try again later",
+                    retry_after=_retry_after(kind, tokens)
+                )
+
+        for kind, key, tokens in levels:
+            _buckets[kind][key] = (tokens - 1, now)
+        _throttle_stats["allowed"] += 1
+
+
+def get_throttle_stats():
+    """
+    Return throttling statistics.
+
+    Returns:
+        dict: allowed, rejected_username, rejected_client, evictions and
+              the number of username / client buckets held
+    """
+    with _throttle_lock:
+        stats = dict(_throttle_stats)
+        stats["username_buckets"] = len(_buckets["username"])
+        stats["client_buckets"] = len(_buckets["client"])
+    return stats
+
+
+def reset_throttle():
+    """Forget all buckets (e.g. after changing THROTTLE_SETTINGS)."""
+    with _throttle_lock:
+        for buckets in _buckets.values():
+            buckets.clear()
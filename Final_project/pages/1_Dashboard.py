@@ -5,6 +5,7 @@ This page appears after successful login.
 """
 
 import streamlit as st
+from app.components import restore_session, end_session
 
 # configure the page
 st.set_page_config(
@@ -13,8 +14,8 @@ st.set_page_config(
     layout="wide"
 )
 
-# Check if user is logged in
-if 'logged_in' not in st.session_state or not st.session_state.logged_in:
+# Check the session token (no password check needed)
+if not restore_session():
     st.error("❌ You must be logged in to view this page")
     
     # Button to go to login page
@@ -110,9 +111,8 @@ with st.sidebar:
     
     # Logout button
     if st.button("🚪 Logout", type="secondary"):
-        # Clear the session state
-        st.session_state.logged_in = False
-        st.session_state.user_info = None
+        # End the server-side session
+        end_session()
         st.success("Logged out successfully!")
         st.switch_page("Home.py")
 
@@ -4,9 +4,11 @@ Settings Dashboard to change the settings
 """
 
 import streamlit as st
-from app.auth import hash_password, validate_password
-from app.data.db import connect_database
-from app.data.users import get_user_by_username, insert_user
+from app.auth import hash_password, verify_password, validate_password
+from app.auth_executor import get_executor_stats
+from app.throttle import get_throttle_stats
+from app.data.users import get_user_by_username, insert_user, update_password_hash
+from app.components import restore_session, end_session
 
 # Configure the page
 st.set_page_config(
@@ -15,8 +17,8 @@ st.set_page_config(
     layout="wide"
 )
 
-# Check if user is logged in
-if 'logged_in' not in st.session_state or not st.session_state.logged_in:
+# Check the session token (no password check needed)
+if not restore_session():
     st.error("❌ You must be logged in to view this page")
     
     # Button to go to login page
@@ -60,23 +62,13 @@ with st.expander("Change Password", expanded=True):
                     st.error(message)
                 else:
                     # Verify current password
-                    conn = connect_database()
                     user = get_user_by_username(st.session_state.user_info['username'])
-                    conn.close()
                     
                     if user:
-                        from app.auth.auth_utils import verify_password
                         if verify_password(current_password, user[2]):
-                            # Update password
+                            # Update password (also drops the cached user row)
                             new_hash = hash_password(new_password)
-                            conn = connect_database()
-                            cursor = conn.cursor()
-                            cursor.execute(
-                                "UPDATE users SET password_hash = ? WHERE id = ?",
-                                (new_hash, st.session_state.user_info['id'])
-                            )
-                            conn.commit()
-                            conn.close()
+                            update_password_hash(st.session_state.user_info['id'], new_hash)
                             st.success("✅ Password updated successfully!")
                         else:
                             st.error("Current password is incorrect")
@@ -131,6 +123,24 @@ with st.expander("System Information"):
         st.code("Multi-Domain Intelligence Platform")
         st.code("Version: 1.0.0")
         st.code(f"User: {st.session_state.user_info['username']}")
+    
+    # Login hashing load (shared by all sessions on this server)
+    auth_stats = get_executor_stats()
+    st.write("**Auth Executor**")
+    st.code(
+        f"Queue depth: {auth_stats['queue_depth']} / workers: {auth_stats['max_workers']}\n"
+        f"Latency p50: {auth_stats['p50_ms']} ms, p99: {auth_stats['p99_ms']} ms\n"
+        f"Completed: {auth_stats['completed']}, rejected: {auth_stats['rejected']}"
+    )
+    
+    # Login throttling
+    throttle_stats = get_throttle_stats()
+    st.write("**Login Throttling**")
+    st.code(
+        f"Allowed: {throttle_stats['allowed']}\n"
+        f"Rejected (username): {throttle_stats['rejected_username']}, "
+        f"rejected (client): {throttle_stats['rejected_client']}"
+    )
 
 # Deletion options
 with st.expander("Deletion options", expanded=False):
@@ -148,8 +158,7 @@ with st.expander("Deletion options", expanded=False):
     
     with col3:
         if st.button("Log Out All Sessions", type="secondary"):
-            st.session_state.logged_in = False
-            st.session_state.user_info = None
+            end_session(all_sessions=True)
             st.success("Logged out from all sessions!")
             st.switch_page("Home.py")
 
@@ -164,6 +173,5 @@ with st.sidebar:
     
     # Logout button
     if st.button("🚪 Logout"):
-        st.session_state.logged_in = False
-        st.session_state.user_info = None
+        end_session()
         st.switch_page("Home.py")
\ No newline at end of file
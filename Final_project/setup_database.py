@@ -8,6 +8,7 @@ import sqlite3
 import bcrypt
 import os
 from pathlib import Path
+from app.data.migrations import migrate, get_schema_version
 
 def setup_database():
 
@@ -80,8 +81,14 @@ def setup_database():
     )
     """)
     
-    # Commit changes and close connection
+    # Commit changes
     conn.commit()
+    
+    # Add indexes and any later schema changes (skipped if already up to date)
+    print("Applying schema migrations...")
+    applied = migrate(conn)
+    print(f"Schema version {get_schema_version(conn)} ({applied} migrations applied)")
+    
     conn.close()
     
     print("Database setup complete!")
@@ -1,11 +1,149 @@
 # Step 3:
 import bcrypt
 import os
+import threading
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:
+    # Windows
+    fcntl = None
+    import msvcrt
+
+# bcrypt cost, shared with the dashboard (see: python -m app.auth in Final_project)
+BCRYPT_ROUNDS = int(os.environ.get("BCRYPT_ROUNDS", 12))
 
 # Step 6:
+# users.txt is an append-only log of "username,hashed_password" lines.
+# The newest line for a username wins. An in-memory index (username -> hash)
+# is built from the log once and then kept up to date by reading only the
+# bytes appended since, so lookups don't scan the file.
 USER_DATA_FILE = "users.txt"
-with open(USER_DATA_FILE, "w") as file:
-    pass
+
+# Rewrite the log without superseded lines once there are this many of them
+# and they outnumber the live users
+COMPACT_MIN_DEAD_RECORDS = 1000
+
+_store_lock = threading.Lock()
+_user_index = {}
+_index_state = {"offset": 0, "inode": None, "records": 0}
+
+
+@contextmanager
+def _locked_log():
+    # Holds an exclusive lock on the log, shared with other processes.
+    # The lock is taken on a separate users.txt.lock file that is never
+    # replaced: compaction swaps users.txt itself, and a process waiting on
+    # a lock held on users.txt would then append to the old, unlinked file.
+    # Nothing keeps users.txt open while locked, so the swap also works on
+    # Windows, where a file can't be replaced while it is open.
+
+    with open(USER_DATA_FILE + ".lock", "a+b") as file:
+        if fcntl:
+            fcntl.flock(file.fileno(), fcntl.LOCK_EX)
+        else:
+            file.seek(0)
+            msvcrt.locking(file.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield file
+        finally:
+            if fcntl:
+                fcntl.flock(file.fileno(), fcntl.LOCK_UN)
+            else:
+                file.seek(0)
+                msvcrt.locking(file.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def _refresh_index():
+    # Brings the index up to date with the log. Only new bytes are read,
+    # unless the file was replaced (e.g. compacted by another process).
+    # Called with _store_lock held.
+
+    try:
+        stat = os.stat(USER_DATA_FILE)
+    except FileNotFoundError:
+        _user_index.clear()
+        _index_state.update(offset=0, inode=None, records=0)
+        return
+
+    if stat.st_ino != _index_state["inode"] or stat.st_size < _index_state["offset"]:
+        _user_index.clear()
+        _index_state.update(offset=0, inode=stat.st_ino, records=0)
+
+    if stat.st_size == _index_state["offset"]:
+        return
+
+    with open(USER_DATA_FILE, "rb") as file:
+        file.seek(_index_state["offset"])
+        for raw_line in file:
+            # A line still being written by another process; read it next time
+            if not raw_line.endswith(b"\n"):
+                break
+            _index_state["offset"] += len(raw_line)
+
+            line = raw_line.decode("utf-8").strip()
+            if not line:
+                continue
+            stored_username, stored_hash = line.split(",", 1)
+            _user_index[stored_username] = stored_hash
+            _index_state["records"] += 1
+
+
+def get_user_hash(username):
+    # Returns the stored hash for a username, or None (O(1) lookup)
+
+    with _store_lock:
+        _refresh_index()
+        return _user_index.get(username)
+
+
+def _append_user(username, hashed, only_if_new=False):
+    # Appends a record to the log under the file lock.
+    # With only_if_new, nothing is written if the username already exists
+    # (checked after taking the lock, so two processes can't both add it).
+
+    with _store_lock:
+        with _locked_log():
+            _refresh_index()
+            if only_if_new and username in _user_index:
+                return False
+
+            # Opened only now, under the lock, so this is always the current
+            # file even if another process has just compacted it.
+            # One write of one whole line, so readers never see half a record
+            with open(USER_DATA_FILE, "ab") as file:
+                file.write(f"{username},{hashed}\n".encode("utf-8"))
+                file.flush()
+                os.fsync(file.fileno())
+
+        _refresh_index()
+        dead_records = _index_state["records"] - len(_user_index)
+
+    if dead_records >= COMPACT_MIN_DEAD_RECORDS and dead_records > len(_user_index):
+        compact_user_store()
+    return True
+
+
+def compact_user_store():
+    # Rewrites the log with only the newest record per user, then swaps it in
+
+    with _store_lock:
+        with _locked_log():
+            _refresh_index()
+            temp_file = USER_DATA_FILE + ".tmp"
+            with open(temp_file, "w", encoding="utf-8") as file:
+                for stored_username, stored_hash in _user_index.items():
+                    file.write(f"{stored_username},{stored_hash}\n")
+                file.flush()
+                os.fsync(file.fileno())
+            os.replace(temp_file, USER_DATA_FILE)
+
+        # Re-read the new file so offsets match it
+        _user_index.clear()
+        _index_state.update(offset=0, inode=None, records=0)
+        _refresh_index()
+        return len(_user_index)
 
 
 # Step 4:
@@ -15,8 +153,8 @@ def hash_password(plain_text_password):
     # TODO: Encode the password to bytes (bcrypt requires byte strings)
     encode_pass = plain_text_password.encode("utf-8")
 
-    # TODO: Generate a salt using bcrypt.gensalt()
-    salt = bcrypt.gensalt()
+    # TODO: Generate a salt using bcrypt.gensalt() with the configured cost
+    salt = bcrypt.gensalt(BCRYPT_ROUNDS)
 
     # TODO: Hash the password using bcrypt.hashpw()
     hashed = bcrypt.hashpw(encode_pass, salt)
@@ -27,6 +165,14 @@ def hash_password(plain_text_password):
     return decode_pass
 
 
+def _hash_rounds(hashed_password):
+    # Returns the cost stored in a bcrypt hash ("$2b$12$..." -> 12), or None if it can't be read
+    parts = hashed_password.split("$")
+    if len(parts) < 4 or not parts[2].isdigit():
+        return None
+    return int(parts[2])
+
+
 # Step 5:
 def verify_password(plain_text_password, hashed_password):
     # Verifies a plaintext password against a stored bcrypt hash
@@ -52,9 +198,10 @@ def register_user(username, password):
     # TODO: Hash the password
     hashed = hash_password(password)
 
-    # TODO: Append the new user to the file
-    with open(USER_DATA_FILE, "a") as file:
-        file.write(f"{username},{hashed}\n")  # Format: username,hashed_password
+    # TODO: Append the new user to the file (re-checked under the file lock)
+    if not _append_user(username, hashed, only_if_new=True):
+        print(f"Error: Username '{username}' already exists.")
+        return False
 
     print(f"Success: User '{username}' registered successfully!")
     return True
@@ -64,18 +211,8 @@ def register_user(username, password):
 def user_exists(username):
     # Checks if a username already exists in users database
 
-    # TODO: Handle the case where the file doesn't exist yet
-    if not os.path.exists(USER_DATA_FILE):
-        return False
-
-    # TODO: Read the file and check each line for the username
-    with open(USER_DATA_FILE, "r") as file:
-        for line in file:
-            stored_username, stored_hash = line.strip().split(",")
-            if stored_username == username:
-                return True
-
-    return False
+    # TODO: Look the username up in the index
+    return get_user_hash(username) is not None
 
 
 # Step 9:
@@ -87,24 +224,26 @@ def login_user(username, password):
         print("Error: No users registered yet.")
         return False
 
-    # TODO: Search for the username in the file
-    with open(USER_DATA_FILE, "r") as file:
-        for line in file:
-            stored_username, stored_hash = line.strip().split(",")
+    # TODO: Find the username's hash in the index
+    stored_hash = get_user_hash(username)
+    if stored_hash is None:
+        print("Error: Username not found.")
+        return False
 
-            if stored_username == username:
-                
-                # TODO: If username matches, verify the password
-                if verify_password(password, stored_hash):
-                    print(f"Success: Welcome, {username}!")
-                    return True
-                else:
-                    print("Error: Invalid password.")
-                    return False
-
-    # TODO: If we reach here, the username was not found
-    print("Error: Username not found.")
-    return False
+    # TODO: Verify the password
+    if not verify_password(password, stored_hash):
+        print("Error: Invalid password.")
+        return False
+
+    # Rehash with the current cost if the stored one is different
+    # (appended to the log; the newest record wins). A hash whose cost
+    # can't be read is left alone.
+    rounds = _hash_rounds(stored_hash)
+    if rounds is not None and rounds != BCRYPT_ROUNDS:
+        _append_user(username, hash_password(password))
+
+    print(f"Success: Welcome, {username}!")
+    return True
 
 
 # Step 10: